@@ -0,0 +1,92 @@
+"""Compares reading a .torrent file with bencode.bdecode then re-encoding its info dictionary to hash it (the previous
+TorrentService path) to torrent.bencode_scanner, on season packs with thousands of files, and checks that they agree.
+
+Run from the source directory: python -m benchmarks.bencode_benchmark [amount of files] [repeats]
+"""
+import hashlib
+import random
+import sys
+import time
+
+import bencode
+
+from torrent.bencode_scanner import scan_torrent, get_info_hash
+
+PIECE_LENGTH = 16 * 1024 * 1024
+
+
+def generate_season_pack(amount_of_files, seed=3):
+    generator = random.Random(seed)
+    files = []
+    total_length = 0
+    for index in range(amount_of_files):
+        season, episode = divmod(index, 24)
+        length = generator.randint(200, 4000) * 1024 * 1024
+        total_length += length
+        files.append({
+            "length": length,
+            "path": [f"Season {season + 1:02d}",
+                     f"Show.Name.S{season + 1:02d}E{episode + 1:02d}.1080p.WEB-DL.Ééé.x265-GRP.mkv"],
+            "md5sum": "%032x" % generator.getrandbits(128)
+        })
+
+    metadata = {
+        "announce": "udp://tracker.example.org:1337/announce",
+        "announce-list": [["udp://tracker.example.org:1337/announce"], ["udp://open.example.com:6969/announce"]],
+        "comment": "Season pack",
+        "created by": "benchmark",
+        "creation date": 1700000000,
+        "info": {
+            "name": "Show.Name.COMPLETE.1080p.WEB-DL.x265-GRP",
+            "piece length": PIECE_LENGTH,
+            "pieces": generator.randbytes(20 * (total_length // PIECE_LENGTH + 1)),
+            "files": files
+        }
+    }
+    return bencode.bencode(metadata)
+
+
+def legacy_read(torrent_file):
+    metadata = bencode.bdecode(torrent_file)
+    info_hash = hashlib.sha1(bencode.bencode(metadata["info"])).hexdigest().lower()
+    files = [{"path": file["path"], "length": file["length"]} for file in metadata["info"].get("files", [])]
+    return info_hash, metadata["info"]["name"], files, metadata.get("announce"), metadata.get("announce-list")
+
+
+def scanner_read(torrent_file):
+    metadata = scan_torrent(torrent_file)
+    return metadata.info_hash, metadata.name, metadata.files or [], metadata.announce, metadata.announce_list
+
+
+def measure(function, torrent_file, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function(torrent_file)
+    return (time.perf_counter() - start) / repeats, result
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    mismatches = 0
+    for amount_of_files in sorted({1, 100, 1000, amount}):
+        torrent_file = generate_season_pack(amount_of_files)
+
+        legacy_duration, legacy_result = measure(legacy_read, torrent_file, repeats)
+        scanner_duration, scanner_result = measure(scanner_read, torrent_file, repeats)
+        hash_duration, info_hash = measure(get_info_hash, torrent_file, repeats)
+
+        mismatch = legacy_result != scanner_result or info_hash != legacy_result[0]
+        mismatches += mismatch
+
+        print(f"{amount_of_files} files, {len(torrent_file) / 1024:.0f} KiB{' (MISMATCH)' if mismatch else ''}")
+        print(f"  bdecode + bencode  {legacy_duration * 1000:8.2f} ms")
+        print(f"  scan_torrent       {scanner_duration * 1000:8.2f} ms ({legacy_duration / scanner_duration:.1f}x)")
+        print(f"  get_info_hash      {hash_duration * 1000:8.2f} ms ({legacy_duration / hash_duration:.1f}x)")
+
+    sys.exit(1 if mismatches > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
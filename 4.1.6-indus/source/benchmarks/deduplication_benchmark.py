@@ -0,0 +1,96 @@
+"""Measures utils.deduplication.ResultDeduplicator on the results of a search finding every release on several indexers,
+with and without info hash, in random order, and checks that every copy of a release ends up in a single group whichever
+copy comes first, while different torrents with the same title and size stay apart.
+
+Run from the source directory: python -m benchmarks.deduplication_benchmark [amount of releases] [copies per release]
+"""
+import random
+import sys
+import time
+
+from jackett.jackett_result import JackettResult
+from utils.deduplication import ResultDeduplicator
+
+INDEXERS = ["YggTorrent", "1337x", "The Pirate Bay", "TorrentGalaxy", "Nyaa"]
+
+
+def create_result(title, size, indexer, info_hash, seeders):
+    result = JackettResult()
+    result.title = title
+    result.size = size
+    result.indexer = indexer
+    result.info_hash = info_hash
+    result.seeders = seeders
+    return result
+
+
+def generate_results(amount_of_releases, copies, seed=7):
+    """Returns the results and the release of each of them. Copies only differ by indexer, seeders, separators and
+    case, and some of them have no info hash."""
+    generator = random.Random(seed)
+    results = []
+    releases = []
+    for release in range(amount_of_releases):
+        title = f"Show.Name.S01E{release % 24 + 1:02d}.1080p.WEB-DL.x265-GRP{release}"
+        size = (release % 4000 + 200) * 1024 * 1024
+        info_hash = "%040x" % (release * 2654435761)
+        for copy in range(copies):
+            copy_title = title.replace(".", " ") if copy % 2 else title.lower()
+            copy_info_hash = info_hash if generator.random() < 0.5 else None
+            results.append(create_result(copy_title, size, INDEXERS[copy % len(INDEXERS)],
+                                         copy_info_hash.upper() if copy_info_hash and copy % 3 else copy_info_hash,
+                                         generator.randint(1, 500)))
+            releases.append(release)
+
+    order = list(range(len(results)))
+    generator.shuffle(order)
+    return [results[position] for position in order], [releases[position] for position in order]
+
+
+def check_orders():
+    """Returns the amount of small cases (a release found with and without info hash, both orders) grouped wrongly."""
+    unhashed = create_result("Show Name S01E01 1080p", 1000, "1337x", None, 10)
+    hashed = create_result("Show.Name.S01E01.1080p", 1000, "YggTorrent", "a" * 40, 20)
+    other_hashed = create_result("Show.Name.S01E01.1080p", 1000, "Nyaa", "b" * 40, 30)
+
+    cases = [
+        ([unhashed, hashed], 1),  # Hashed after unhashed
+        ([hashed, unhashed], 1),  # Unhashed after hashed
+        ([unhashed, hashed, other_hashed], 2),  # Another torrent with the same title and size
+        ([hashed, other_hashed, unhashed], 2),
+    ]
+
+    wrong = 0
+    for results, expected_groups in cases:
+        deduplicator = ResultDeduplicator()
+        new_results = deduplicator.add(results)
+        if len(new_results) != expected_groups:
+            wrong += 1
+        elif expected_groups == 1 and deduplicator.get_best(new_results[0]) is not hashed:  # Best seeded copy
+            wrong += 1
+
+    return wrong
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    results, releases = generate_results(amount, copies)
+
+    deduplicator = ResultDeduplicator()
+    start = time.perf_counter()
+    new_results = deduplicator.add(results)
+    duration = time.perf_counter() - start
+
+    release_by_result = {id(result): release for result, release in zip(results, releases)}
+    new_releases = [release_by_result[id(result)] for result in new_results]
+    mismatches = len(new_releases) - len(set(new_releases)) + amount - len(set(new_releases)) + check_orders()
+
+    print(f"{len(results)} results of {amount} releases, {len(new_results)} kept ({mismatches} mismatches)")
+    print(f"  add              {duration * 1000:8.2f} ms ({duration / len(results) * 1000000:.2f} us per result)")
+
+    sys.exit(1 if mismatches > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
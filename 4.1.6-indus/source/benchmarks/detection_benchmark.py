@@ -0,0 +1,160 @@
+"""Checks that utils.detection gives byte for byte the same output as the regex implementation it replaced, and
+compares their speed.
+
+Run from the source directory: python -m benchmarks.detection_benchmark [amount of titles]
+"""
+import random
+import re
+import sys
+import time
+
+from utils.detection import detect_release
+
+# Previous implementation of utils.detection, kept verbatim as the reference
+
+
+def legacy_detect_quality(torrent_name):
+    quality_patterns = {
+        "4k": r'\b(2160P|UHD|4K)\b',
+        "1080p": r'\b(1080P|FHD|FULLHD|HD|HIGHDEFINITION)\b',
+        "720p": r'\b(720P|HD|HIGHDEFINITION)\b',
+        "480p": r'\b(480P|SD|STANDARDDEFINITION)\b'
+    }
+
+    for quality, pattern in quality_patterns.items():
+        if re.search(pattern, torrent_name, re.IGNORECASE):
+            return quality
+    return "Unknown"
+
+
+def legacy_detect_quality_spec(torrent_name):
+    quality_patterns = {
+        "HDR": r'\b(HDR|HDR10|HDR10PLUS|HDR10PLUS|HDR10PLUS)\b',
+        "DTS": r'\b(DTS|DTS-HD)\b',
+        "DDP": r'\b(DDP|DDP5.1|DDP7.1)\b',
+        "DD": r'\b(DD|DD5.1|DD7.1)\b',
+        "SDR": r'\b(SDR|SDRIP)\b',
+        "WEBDL": r'\b(WEBDL|WEB-DL|WEB)\b',
+        "BLURAY": r'\b(BLURAY|BLU-RAY|BD)\b',
+        "DVDRIP": r'\b(DVDRIP|DVDR)\b',
+        "CAM": r'\b(CAM|CAMRIP|CAM-RIP)\b',
+        "TS": r'\b(TS|TELESYNC|TELESYNC)\b',
+        "TC": r'\b(TC|TELECINE|TELECINE)\b',
+        "R5": r'\b(R5|R5LINE|R5-LINE)\b',
+        "DVDSCR": r'\b(DVDSCR|DVD-SCR)\b',
+        "HDTV": r'\b(HDTV|HDTVRIP|HDTV-RIP)\b',
+        "PDTV": r'\b(PDTV|PDTVRIP|PDTV-RIP)\b',
+        "DSR": r'\b(DSR|DSRRIP|DSR-RIP)\b',
+        "WORKPRINT": r'\b(WORKPRINT|WP)\b',
+        "VHSRIP": r'\b(VHSRIP|VHS-RIP)\b',
+        "VODRIP": r'\b(VODRIP|VOD-RIP)\b',
+        "TVRIP": r'\b(TVRIP|TV-RIP)\b',
+        "WEBRIP": r'\b(WEBRIP|WEB-RIP)\b',
+        "BRRIP": r'\b(BRRIP|BR-RIP)\b',
+        "BDRIP": r'\b(BDRIP|BD-RIP)\b',
+        "HDCAM": r'\b(HDCAM|HD-CAM)\b',
+        "HDRIP": r'\b(HDRIP|HD-RIP)\b',
+    }
+
+    qualities = []
+    for quality, pattern in quality_patterns.items():
+        if re.search(pattern, torrent_name, re.IGNORECASE):
+            qualities.append(quality)
+    return qualities if qualities else None
+
+
+def legacy_detect_languages(torrent_name):
+    language_patterns = {
+        "fr": r'\b(FRENCH|FR|VF|VF2|VFF|TRUEFRENCH|VFQ|FRA)\b',
+        "en": r'\b(ENGLISH|EN|ENG)\b',
+        "es": r'\b(SPANISH|ES|ESP)\b',
+        "de": r'\b(GERMAN|DE|GER)\b',
+        "it": r'\b(ITALIAN|IT|ITA)\b',
+        "pt": r'\b(PORTUGUESE|PT|POR)\b',
+        "ru": r'\b(RUSSIAN|RU|RUS)\b',
+        "in": r'\b(INDIAN|IN|HINDI|TELUGU|TAMIL|KANNADA|MALAYALAM|PUNJABI|MARATHI|BENGALI|GUJARATI|URDU|ODIA|ASSAMESE|KONKANI|MANIPURI|NEPALI|SANSKRIT|SINHALA|SINDHI|TIBETAN|BHOJPURI|DHIVEHI|KASHMIRI|KURUKH|MAITHILI|NEWARI|RAJASTHANI|SANTALI|SINDHI|TULU)\b',
+        "nl": r'\b(DUTCH|NL|NLD)\b',
+        "hu": r'\b(HUNGARIAN|HU|HUN)\b',
+        "la": r'\b(LATIN|LATINO|LA)\b',
+        "multi": r"\b(MULTI)\b"
+    }
+
+    languages = []
+    for language, pattern in language_patterns.items():
+        if re.search(pattern, torrent_name, re.IGNORECASE):
+            languages.append(language)
+
+    if re.search(r'\bMULTI\b', torrent_name, re.IGNORECASE):
+        languages.append("multi")
+
+    if len(languages) == 0:
+        return ["en"]
+
+    return languages
+
+
+WORDS = [
+    "The", "Movie", "Show", "Night", "Of", "2019", "2023", "S01E02", "S03", "COMPLETE", "PROPER", "REPACK", "iNTERNAL",
+    "2160p", "1080p", "720p", "480p", "4K", "UHD", "FHD", "FullHD", "HD", "SD", "HDR", "HDR10", "HDR10Plus", "SDR",
+    "DTS", "DTS-HD", "DDP", "DDP5.1", "DDP7.1", "DDP5 1", "DDP5x1", "DD", "DD5.1", "DD+", "AC3", "AAC", "x264", "x265",
+    "HEVC", "H264", "10bit", "WEB", "WEB-DL", "WEBDL", "WEBRip", "WEB-Rip", "BluRay", "Blu-Ray", "BD", "BDRip",
+    "BD-Rip", "BRRip", "BR-Rip", "DVDRip", "DVDR", "DVDSCR", "DVD-SCR", "CAM", "CAMRip", "CAM-Rip", "HDCAM", "HD-CAM",
+    "TS", "TELESYNC", "TC", "TELECINE", "R5", "R5-LINE", "HDTV", "HDTV-Rip", "PDTV", "DSR", "WP", "WORKPRINT",
+    "VHSRip", "VHS-Rip", "VODRip", "VOD-Rip", "TVRip", "TV-Rip", "HDRip", "HD-Rip", "MULTi", "MULTI", "FRENCH",
+    "TRUEFRENCH", "VFF", "VF2", "VFQ", "FR", "EN", "ENG", "English", "ESP", "Spanish", "GER", "German", "ITA", "iTA",
+    "POR", "RUS", "Hindi", "Tamil", "Telugu", "NL", "Dutch", "HUN", "Latino", "LA", "MULTI-VF2", "VOSTFR", "SUBFRENCH",
+    "Kannada", "HD_CAM", "Saison", "GRP", "EXTREME", "iNTEGRALE",
+    # Case insensitive matching is unicode aware, these must give the same result as with the regex engine
+    "Épisode", "Français", "Ｈｄ", "ſd", "4\u212a", "Hındı", "ＤＤＰ5.1", "DDP5é1"
+]
+SEPARATORS = [".", " ", "-", "_", "[", "]", "(", ")", "+", "/"]
+
+
+def generate_titles(amount):
+    generator = random.Random(42)
+    titles = []
+    for _ in range(amount):
+        parts = generator.sample(WORDS, generator.randint(3, 12))
+        title = ""
+        for part in parts:
+            title += part + generator.choice(SEPARATORS)
+        titles.append(title + generator.choice(["RARBG", "YTS", "EZTV", "GRP"]))
+
+    return titles
+
+
+def legacy_detect_release(title):
+    return legacy_detect_quality(title), legacy_detect_quality_spec(title), legacy_detect_languages(title)
+
+
+def measure(function, titles):
+    start = time.perf_counter()
+    for title in titles:
+        function(title)
+    return time.perf_counter() - start
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    titles = generate_titles(amount)
+
+    mismatches = [title for title in titles if detect_release(title) != legacy_detect_release(title)]
+    for title in mismatches[:10]:
+        print(f"MISMATCH {title!r}: {detect_release(title)} != {legacy_detect_release(title)}")
+
+    # The outputs are compared as reprs too, to catch a list that would only be equal (None vs [] for instance)
+    mismatches += [title for title in titles if repr(detect_release(title)) != repr(legacy_detect_release(title))]
+
+    legacy_duration = measure(legacy_detect_release, titles)
+    duration = measure(detect_release, titles)
+
+    print(f"{amount} titles, {len(mismatches)} mismatches")
+    print(f"regex detection:  {legacy_duration * 1000:.1f} ms ({legacy_duration / amount * 1e6:.1f} us/title)")
+    print(f"token detection:  {duration * 1000:.1f} ms ({duration / amount * 1e6:.1f} us/title)")
+    print(f"speedup: {legacy_duration / duration:.1f}x")
+
+    sys.exit(1 if len(mismatches) > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compares ways of excluding titles containing any of a set of keywords, and checks that they agree.
+
+- loop: the previous TitleExclusionFilter, upper-casing the title for every keyword
+- hoisted loop: the title upper-cased once, then `keyword in title` for every keyword
+- regex: a precompiled alternation of the escaped keywords
+- automaton: the Aho-Corasick DFA of utils.keyword_matcher, scanning the title once
+
+Run from the source directory: python -m benchmarks.keyword_matcher_benchmark [amount of titles] [amount of keywords]
+"""
+import random
+import re
+import sys
+import time
+
+from benchmarks.detection_benchmark import generate_titles
+from utils import keyword_matcher
+from utils.keyword_matcher import KeywordMatcher
+
+KEYWORDS = [
+    "CAM", "HDCAM", "TS", "HDTS", "TELESYNC", "SCREENER", "SCR", "DVDSCR", "R5", "3D", "HSBS", "SBS", "KORSUB",
+    "HC", "HARDSUB", "RUS", "UKR", "HINDI", "TAMIL", "TELUGU", "DUBBED", "DUB", "LINE", "MIC", "SAMPLE", "TRAILER",
+    "EXTRAS", "BONUS", "FEATURETTE", "XXX", "PORN", "ANIME", "CARTOON", "KIDS", "REMUX", "ISO", "IMAGE", "COMPLETE",
+    "PACK", "COLLECTION", "UPSCALED", "AI", "FAKE", "PASSWORD", "RAR", "ZIP", "EXE", "VIRUS", "YIFY", "YTS", "EVO",
+    "FGT", "PSA", "MEGUSTA", "NOGRP", "RARBG", "TGX", "QXR", "TIGOLE", "JOY", "ION10", "HEVC", "AV1", "DV", "DOVI",
+    "ATMOS", "TRUEHD", "DTS-X", "OPUS", "FLAC", "MONO", "STEREO", "VOSTFR", "SUBFRENCH", "CUSTOM", "HYBRID", "DIRFIX",
+    "NFOFIX", "SUBFIX", "READNFO", "INTERNAL", "LIMITED", "FESTIVAL", "WORKPRINT", "TC", "PPV", "VODRIP", "DSR",
+    "PDTV", "SATRIP", "TVRIP", "VHSRIP", "LD", "LQ", "POOR", "SCREENER2", "WEBSCREENER", "PRE-RELEASE"
+]
+
+
+def legacy_is_excluded(title, keywords):
+    for keyword in keywords:
+        if keyword in title.upper():
+            return True
+    return False
+
+
+def hoisted_is_excluded(title, keywords):
+    title = title.upper()
+    for keyword in keywords:
+        if keyword in title:
+            return True
+    return False
+
+
+def measure(function, titles):
+    start = time.perf_counter()
+    decisions = [function(title) for title in titles]
+    return time.perf_counter() - start, decisions
+
+
+def compare(titles, keywords):
+    upper_keywords = [keyword.upper() for keyword in keywords]
+    regex = re.compile("|".join(re.escape(keyword) for keyword in upper_keywords))
+
+    # Force each implementation of the matcher, whatever the threshold is
+    keyword_matcher.AUTOMATON_MIN_KEYWORDS = len(keywords) + 1
+    loop_matcher = KeywordMatcher(keywords)
+    keyword_matcher.AUTOMATON_MIN_KEYWORDS = 0
+    start = time.perf_counter()
+    automaton_matcher = KeywordMatcher(keywords)
+    build_duration = time.perf_counter() - start
+
+    results = {
+        "loop": measure(lambda title: legacy_is_excluded(title, upper_keywords), titles),
+        "hoisted loop": measure(lambda title: hoisted_is_excluded(title, upper_keywords), titles),
+        "regex": measure(lambda title: regex.search(title.upper()) is not None, titles),
+        "matcher (loop)": measure(loop_matcher.matches, titles),
+        "automaton": measure(automaton_matcher.matches, titles),
+    }
+
+    reference = results["loop"][1]
+    mismatches = sum(1 for _, decisions in results.values() for a, b in zip(reference, decisions) if a != b)
+    return {name: duration for name, (duration, _) in results.items()}, sum(reference), mismatches, build_duration
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    keyword_amount = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    titles = generate_titles(amount)
+    generator = random.Random(7)
+
+    total_mismatches = 0
+    for amount_of_keywords in sorted({5, 10, 20, 32, keyword_amount, 100}):
+        keywords = generator.sample(KEYWORDS, min(amount_of_keywords, len(KEYWORDS)))
+        durations, excluded, mismatches, build_duration = compare(titles, keywords)
+        total_mismatches += mismatches
+
+        print(f"{amount} titles x {len(keywords)} keywords ({excluded} excluded, {mismatches} mismatches, "
+              f"automaton built in {build_duration * 1000:.2f} ms)")
+        for name, duration in durations.items():
+            print(f"  {name:<16} {duration * 1000:8.1f} ms")
+
+    sys.exit(1 if total_mismatches > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
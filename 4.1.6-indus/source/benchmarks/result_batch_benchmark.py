@@ -0,0 +1,120 @@
+"""Compares filtering and ranking thousands of Jackett results item by item to doing it on the columns of a
+utils.result_batch.ResultBatch, and checks that both keep the same results in the same order.
+
+Run from the source directory: python -m benchmarks.result_batch_benchmark [amount of results] [repeats]
+"""
+import random
+import sys
+import time
+
+import utils.result_batch as result_batch
+from jackett.jackett_result import JackettResult
+from models.series import Series
+from utils.detection import detect_batch
+from utils.filter.filter_pipeline import FilterPipeline
+from utils.filter.language_filter import LanguageFilter
+from utils.filter.max_size_filter import MaxSizeFilter
+from utils.filter.quality_exclusion_filter import QualityExclusionFilter
+from utils.filter.results_per_quality_filter import ResultsPerQualityFilter
+from utils.filter.season_episode_filter import SeasonEpisodeFilter
+from utils.filter.title_exclusion_filter import TitleExclusionFilter
+from utils.ranking import rank_candidates
+
+CONFIG = {
+    'languages': ["fr", "en"],
+    'maxSize': 6 * 1024 * 1024 * 1024,
+    'exclusionKeywords': ["KORSUB", "Sample"],
+    'exclusion': ["720p", "RIPS", "CAM"],
+    'resultsPerQuality': 200,
+    'debrid': False,
+    'torrenting': True,
+}
+SORTS = ["quality", "sizeasc", "sizedesc", "qualitythensize", "none"]
+
+QUALITIES = ["2160p", "1080p", "720p", "480p", "HDTV", ""]
+SPECS = ["WEB-DL", "BluRay", "WEBRip", "HDRip", "CAM", "HDR", "DDP5.1", "DTS", ""]
+LANGUAGES = ["FRENCH", "VFF", "ENG", "GERMAN", "ITA", "MULTI", "KORSUB", ""]
+
+
+def generate_results(amount_of_results, seed=7):
+    generator = random.Random(seed)
+    titles = []
+    for index in range(amount_of_results):
+        season = generator.choice([1, 1, 1, 2])
+        episode = generator.choice([1, 2, 3, None])
+        parts = ["Show.Name", f"S{season:02d}E{episode:02d}" if episode is not None else f"S{season:02d}",
+                 generator.choice(QUALITIES), generator.choice(SPECS), generator.choice(SPECS),
+                 generator.choice(LANGUAGES), "x265-GRP"]
+        titles.append(".".join(part for part in parts if part))
+
+    results = []
+    for index, (title, release_info) in enumerate(zip(titles, detect_batch(titles))):
+        result = JackettResult()
+        result.title = title
+        result.size = generator.randint(200, 8000) * 1024 * 1024
+        result.seeders = generator.randint(1, 300)
+        result.indexer = "Indexer"
+        result.privacy = "private" if index % 5 == 0 else "public"
+        result.info_hash = "%040x" % index if index % 3 else None
+        result.release_info = release_info
+        result.type = "series"
+        results.append(result)
+
+    return results
+
+
+def get_pipeline():
+    return FilterPipeline({
+        "seasonEpisode": SeasonEpisodeFilter(CONFIG, "series"),
+        "languages": LanguageFilter(CONFIG),
+        "maxSize": MaxSizeFilter(CONFIG, "series"),
+        "exclusionKeywords": TitleExclusionFilter(CONFIG),
+        "exclusion": QualityExclusionFilter(CONFIG),
+    }, {
+        "resultsPerQuality": ResultsPerQualityFilter(CONFIG)
+    })
+
+
+def run(results, media, repeats):
+    pipeline = get_pipeline()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        filtered_results = pipeline(results, media)
+    filter_duration = (time.perf_counter() - start) / repeats
+
+    ranked_results = []
+    start = time.perf_counter()
+    for sort in SORTS:
+        for debrid in (False, True):
+            ranked_results.append(rank_candidates(results, dict(CONFIG, sort=sort, debrid=debrid)))
+    rank_duration = (time.perf_counter() - start) / len(ranked_results)
+
+    return filter_duration, rank_duration, filtered_results, ranked_results
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    results = generate_results(amount)
+    media = Series("tt0000000", ["Show Name"], "S01", "E02", ["fr", "en"])
+
+    result_batch.COLUMNAR_MIN_RESULTS = 0
+    item_filter, item_rank, item_filtered, item_ranked = run(results, media, repeats)
+    result_batch.COLUMNAR_MIN_RESULTS = 1
+    batch_filter, batch_rank, batch_filtered, batch_ranked = run(results, media, repeats)
+
+    mismatches = (item_filtered != batch_filtered) + sum(
+        1 for item, batch in zip(item_ranked, batch_ranked) if item != batch)
+
+    print(f"{amount} results, {len(item_filtered)} kept by the filters ({mismatches} mismatches)")
+    print(f"  filter, item by item      {item_filter * 1000:8.2f} ms")
+    print(f"  filter, columns           {batch_filter * 1000:8.2f} ms ({item_filter / batch_filter:.1f}x)")
+    print(f"  rank, item by item        {item_rank * 1000:8.2f} ms")
+    print(f"  rank, columns             {batch_rank * 1000:8.2f} ms ({item_rank / batch_rank:.1f}x)")
+
+    sys.exit(1 if mismatches > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Compares the memory held by search results with the previous dict-backed JackettResult and TorrentItem (string size
+and seeders, a logger per item, a new string per indexer) to the slotted records, on a generated torznab response.
+Everything kept from the response is counted: torznab items, results and torrent items.
+
+Run from the source directory: python -m benchmarks.result_memory_benchmark [amount of results]
+"""
+import gc
+import sys
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from jackett.torznab_parser import parse_torznab_items, TorznabItem, TORZNAB_ATTR, CHUNK_SIZE
+from jackett.jackett_result import JackettResult
+from utils.logger import setup_logger
+
+INDEXERS = ["YggTorrent", "1337x", "The Pirate Bay", "TorrentGalaxy", "Nyaa"]
+
+
+class LegacyJackettResult:
+    def __init__(self):
+        self.title = None
+        self.size = None
+        self.link = None
+        self.indexer = None
+        self.seeders = None
+        self.magnet = None
+        self.info_hash = None
+        self.privacy = None
+        self.release_info = None
+        self.type = None
+        self.season = None
+        self.episode = None
+
+    def convert_to_torrent_item(self):
+        return LegacyTorrentItem(self.title, self.size, self.magnet,
+                                 self.info_hash.lower() if self.info_hash is not None else None, self.link,
+                                 self.seeders, self.release_info, self.indexer, self.privacy, self.episode,
+                                 self.season, self.type)
+
+
+class LegacyTorrentItem:
+    def __init__(self, title, size, magnet, info_hash, link, seeders, release_info, indexer, privacy,
+                 episode=None, season=None, type=None):
+        self.logger = setup_logger(__name__)
+
+        self.title = title
+        self.size = size
+        self.magnet = magnet
+        self.info_hash = info_hash
+        self.link = link
+        self.seeders = seeders
+        self.release_info = release_info
+        self.indexer = indexer
+        self.episode = episode
+        self.season = season
+        self.type = type
+        self.privacy = privacy
+
+        self.file_name = None
+        self.files = None
+        self.torrent_download = None
+        self.trackers = []
+        self.file_index = None
+
+        self.availability = False
+
+
+def generate_torznab_response(amount_of_results):
+    items = []
+    for index in range(amount_of_results):
+        info_hash = "%040x" % (index * 2654435761)
+        items.append(
+            f"<item><title>Show.Name.S01E{index % 24 + 1:02d}.1080p.WEB-DL.x265-GRP{index}</title>"
+            f"<size>{(index % 4000 + 200) * 1024 * 1024}</size>"
+            f"<link>http://localhost:9117/dl/{index}</link>"
+            f"<jackettindexer>{INDEXERS[index % len(INDEXERS)]}</jackettindexer>"
+            f"<type>{'private' if index % 3 == 0 else 'public'}</type>"
+            f"<torznab:attr name=\"seeders\" value=\"{index % 500 + 1}\" />"
+            f"<torznab:attr name=\"infohash\" value=\"{info_hash}\" />"
+            f"<torznab:attr name=\"magneturl\" value=\"magnet:?xt=urn:btih:{info_hash}\" />"
+            f"</item>")
+
+    return (f"<rss xmlns:torznab=\"{TORZNAB_ATTR[1:TORZNAB_ATTR.index('}')]}\"><channel>"
+            f"{''.join(items)}</channel></rss>")
+
+
+def legacy_parse_torznab_items(xml_content):
+    # The previous parser kept the text of the response: strings for size and seeders, a new indexer string per item
+    parser = ET.XMLPullParser(events=('end',))
+    items = []
+    for start in range(0, len(xml_content) + CHUNK_SIZE, CHUNK_SIZE):
+        if start < len(xml_content):
+            parser.feed(xml_content[start:start + CHUNK_SIZE])
+        else:
+            parser.close()
+
+        for _, element in parser.read_events():
+            if element.tag != 'item':
+                continue
+
+            attributes = {child.get('name'): child.get('value') for child in element if child.tag == TORZNAB_ATTR}
+            if int(attributes.get('seeders') or 0) > 0:
+                items.append(TorznabItem(element.findtext('title'), element.findtext('size'), element.findtext('link'),
+                                         element.findtext('jackettindexer'), element.findtext('type'),
+                                         attributes['seeders'], attributes.get('magneturl'),
+                                         attributes.get('infohash')))
+            element.clear()
+
+    return items
+
+
+def build_results(parse, result_class, xml_content):
+    items = parse(xml_content)
+    results = []
+    for item in items:
+        result = result_class()
+        result.title = item.title
+        result.size = item.size
+        result.link = item.link
+        result.indexer = item.indexer
+        result.privacy = item.privacy
+        result.seeders = item.seeders
+        result.magnet = item.magnet
+        result.info_hash = item.info_hash
+        results.append(result)
+
+    return items, results, [result.convert_to_torrent_item() for result in results]
+
+
+def measure(parse, result_class, xml_content):
+    gc.collect()
+    tracemalloc.start()
+    kept = build_results(parse, result_class, xml_content)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return memory, kept
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    xml_content = generate_torznab_response(amount)
+
+    legacy_memory, (legacy_items, _, _) = measure(legacy_parse_torznab_items, LegacyJackettResult, xml_content)
+    memory, (items, results, torrent_items) = measure(parse_torznab_items, JackettResult, xml_content)
+
+    mismatches = sum(1 for legacy, result, torrent_item in zip(legacy_items, results, torrent_items)
+                     if int(legacy.size) != result.size or int(legacy.seeders) != torrent_item.seeders
+                     or legacy.indexer != torrent_item.indexer)
+
+    print(f"{len(items)} results ({mismatches} mismatches)")
+    print(f"  dict-backed, str fields    {legacy_memory / 1024 / 1024:8.1f} MiB")
+    print(f"  slotted, int fields        {memory / 1024 / 1024:8.1f} MiB ({legacy_memory / memory:.2f}x less)")
+
+    sys.exit(1 if mismatches > 0 or len(items) != amount else 0)
+
+
+if __name__ == "__main__":
+    main()
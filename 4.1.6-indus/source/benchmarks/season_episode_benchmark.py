@@ -0,0 +1,141 @@
+"""Compares finding the file of an episode in a big season pack with the previous strict then non-strict substring
+checks to utils.season_episode.
+
+Parsing a whole list is slower than one lookup with the previous checks: that only pays off when the parsed list is
+reused (TorrentFileList keeps it for every episode of a torrent, file names are memoized), lookups on a parsed list are
+cheap. A single lookup on a list never seen before (debrid file lists) only parses the files that may be the episode.
+The file name cache is cleared before timing cold lookups and parsing.
+
+Names that were parsed wrongly before (codecs taken for 1x02 episodes, 4 digit seasons) are checked as well.
+
+Run from the source directory: python -m benchmarks.season_episode_benchmark [amount of files] [repeats]
+"""
+import sys
+import time
+
+from utils.general import is_video_file
+from utils.season_episode import match_episode_files, parse_files, match_parsed_files, parse_season_episode, \
+    _parse_file
+
+# Name -> (seasons, episodes) it tells
+PARSE_CASES = {
+    "Show.S01.1080p.DD5.1x264-GRP": ({1}, set()),
+    "Show.S01.1080p.AAC2.0x265-GRP": ({1}, set()),
+    "Show.S02.2160p.DDP5.1.x265-GRP": ({2}, set()),
+    "Show.S2024E01.1080p.WEB-DL": ({2024}, {1}),
+    "Show.S2024.1080p.WEB-DL": ({2024}, set()),
+    "Show.1x02.HDTV.x264": ({1}, {2}),
+    "Show 1x01-1x03 720p": ({1}, {1, 2, 3}),
+    "Show.S01E01-E03.1080p": ({1}, {1, 2, 3}),
+}
+
+
+def legacy_season_episode_in_filename(filename, season, episode, strict=False):
+    if not is_video_file(filename):
+        return False
+
+    if strict:
+        if not season.lower().startswith("s"):
+            season = "s" + season
+        if not episode.lower().startswith("e"):
+            episode = "e" + episode
+    else:
+        if season.lower().startswith("s"):
+            season = season[1:]
+        if episode.lower().startswith("e"):
+            episode = episode[1:]
+
+    filename = filename.lower()
+    season = season.lower()
+    episode = episode.lower()
+
+    return season in filename and episode in filename and filename.index(season) < filename.rindex(episode)
+
+
+def legacy_match(file_names, season, episode):
+    strict_positions = []
+    positions = []
+    for position, file_name in enumerate(file_names):
+        if legacy_season_episode_in_filename(file_name, season, episode, strict=True):
+            strict_positions.append(position)
+        elif legacy_season_episode_in_filename(file_name, season, episode, strict=False):
+            positions.append(position)
+
+    return strict_positions if len(strict_positions) > 0 else positions
+
+
+def generate_season_pack(amount_of_files):
+    file_names = []
+    for index in range(amount_of_files):
+        season, episode = divmod(index, 50)
+        folder = f"Show.S{season + 1:02d}.1080p.WEB-DL.x265-GRP"
+        file_names.append(f"{folder}/Show.S{season + 1:02d}E{episode + 1:02d}.1080p.WEB-DL.x265-GRP.mkv")
+        if episode % 10 == 0:
+            file_names.append(f"{folder}/Show.S{season + 1:02d}E{episode + 1:02d}.nfo")
+    return file_names
+
+
+def measure(function, episodes, repeats, setup=None):
+    # Best of several runs, single runs are too noisy to compare
+    best_duration = None
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        results = [function(season, episode) for season, episode in episodes]
+        duration = time.perf_counter() - start
+        best_duration = duration if best_duration is None else min(best_duration, duration)
+
+    return best_duration, results
+
+
+def check_parse_cases():
+    """Returns the amount of PARSE_CASES parsed wrongly."""
+    wrong = 0
+    for name, (seasons, episodes) in PARSE_CASES.items():
+        season_episode = parse_season_episode(name)
+        if season_episode.seasons != seasons or season_episode.episodes != episodes:
+            print(f"  {name} parsed as {sorted(season_episode.seasons)} {sorted(season_episode.episodes)}")
+            wrong += 1
+
+    return wrong
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    file_names = generate_season_pack(amount)
+    episodes = [(f"S{season:02d}", f"E{episode:02d}") for season in (1, amount // 100) for episode in (1, 25, 50)]
+
+    legacy_duration, legacy_results = measure(lambda season, episode: legacy_match(file_names, season, episode),
+                                              episodes, repeats)
+    # Single lookups on a list never seen before: only the files that may be the episode are parsed
+    cold_duration, cold_results = measure(lambda season, episode: (_parse_file.cache_clear(),
+                                                                   match_episode_files(file_names, season, episode))[1],
+                                          episodes, repeats)
+
+    parse_duration, _ = measure(lambda season, episode: parse_files(file_names), episodes[:1], repeats,
+                                setup=_parse_file.cache_clear)
+    parsed_files = parse_files(file_names)
+    indexed_duration, indexed_results = measure(
+        lambda season, episode: match_parsed_files(parsed_files, season, episode), episodes, repeats)
+
+    # The previous matching also took S01E10 to S01E19 for S01E01 (non-strict), only strict matches are compared
+    mismatches = sum(1 for legacy, indexed in zip(legacy_results, indexed_results) if legacy != indexed)
+    mismatches += sum(1 for cold, indexed in zip(cold_results, indexed_results) if cold != indexed)
+    mismatches += check_parse_cases()
+
+    lookups = len(episodes)
+    print(f"{len(file_names)} files, {lookups} episodes looked up ({mismatches} mismatches), per lookup:")
+    print(f"  strict + non-strict loops        {legacy_duration / lookups * 1000:8.2f} ms")
+    print(f"  match_episode_files, cold cache  {cold_duration / lookups * 1000:8.2f} ms")
+    print(f"  match_parsed_files               {indexed_duration / lookups * 1000:8.2f} ms "
+          f"(after parsing once in {parse_duration * 1000:.1f} ms)")
+    print(f"Parsing the whole list is slower than the loops, reusing it (TorrentFileList, file name cache) pays off "
+          f"after {parse_duration / max(legacy_duration / lookups - indexed_duration / lookups, 1e-9):.1f} lookups")
+
+    sys.exit(1 if mismatches > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
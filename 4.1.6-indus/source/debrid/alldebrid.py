@@ -5,7 +5,7 @@ from urllib.parse import unquote
 
 from constants import NO_CACHE_VIDEO_URL
 from debrid.base_debrid import BaseDebrid
-from utils.general import season_episode_in_filename
+from utils.season_episode import match_episode_files
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -62,16 +62,9 @@ class AllDebrid(BaseDebrid):
             episode = query['episode']
             logger.info(f"Getting link for series {season}, {episode}")
 
-            strict_matching_files = []
-            matching_files = []
-            for file in data["magnets"]["links"]:
-                if season_episode_in_filename(file["filename"], season, episode, strict=True):
-                    strict_matching_files.append(file)
-                elif season_episode_in_filename(file["filename"], season, episode, strict=False):
-                    matching_files.append(file)
-
-            if len(strict_matching_files) > 0:
-                matching_files = strict_matching_files
+            files = data["magnets"]["links"]
+            matching_files = [files[position] for position in
+                              match_episode_files([file["filename"] for file in files], season, episode)]
 
             if len(matching_files) == 0:
                 logger.error(f"No matching files for {season} {episode} in torrent.")
@@ -118,7 +111,7 @@ class AllDebrid(BaseDebrid):
             torrent_id = magnet_response["data"]["magnets"][0]["id"]
         else:
             logger.info(f"Downloading torrent file from Jackett")
-            torrent_file = self.donwload_torrent_file(torrent_download)
+            torrent_file = self.donwload_torrent_file(torrent_download, magnet)
             logger.info(f"Torrent file downloaded from Jackett")
 
             logger.info(f"Adding torrent file to AllDebrid")
@@ -2,6 +2,8 @@ import time
 
 import requests
 
+from torrent.torrent_file_cache import torrent_file_cache
+from utils.general import get_info_hash_from_magnet
 from utils.logger import setup_logger
 
 
@@ -45,10 +47,22 @@ class BaseDebrid:
         self.logger.info(f"Waiting timed out.")
         return False
 
-    def donwload_torrent_file(self, download_url):
+    def donwload_torrent_file(self, download_url, magnet=None):
+        # Most of the time, the search already downloaded it
+        cached = torrent_file_cache.get(download_url)
+        if cached is not None:
+            torrent_file = cached[0]
+        else:
+            torrent_file = torrent_file_cache.get_torrent(get_info_hash_from_magnet(magnet) if magnet else None)
+
+        if torrent_file is not None:
+            self.logger.info("Torrent file found in cache")
+            return torrent_file
+
         response = requests.get(download_url)
         response.raise_for_status()
 
+        torrent_file_cache.put_torrent(download_url, response.content)
         return response.content
 
     def get_stream_link(self, query, ip=None):
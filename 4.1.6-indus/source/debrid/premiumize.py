@@ -3,7 +3,8 @@ import json
 
 from constants import NO_CACHE_VIDEO_URL
 from debrid.base_debrid import BaseDebrid
-from utils.general import get_info_hash_from_magnet, season_episode_in_filename
+from utils.general import get_info_hash_from_magnet
+from utils.season_episode import match_episode_files
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -101,17 +102,8 @@ class Premiumize(BaseDebrid):
                 season = query["season"]
                 episode = query["episode"]
                 files = details.get("content", [])
-                strict_matching_files = []
-                matching_files = []
-
-                for file in files:
-                    if season_episode_in_filename(file["name"], season, episode, strict=True):
-                        strict_matching_files.append(file)
-                    elif season_episode_in_filename(file["name"], season, episode, strict=False):
-                        matching_files.append(file)
-
-                if len(strict_matching_files) > 0:
-                    matching_files = strict_matching_files
+                matching_files = [files[position] for position in
+                                  match_episode_files([file["name"] for file in files], season, episode)]
 
                 if len(matching_files) == 0:
                     logger.error(f"No matching files for {season} {episode} in torrent.")
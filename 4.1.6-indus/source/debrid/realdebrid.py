@@ -6,9 +6,11 @@ import requests
 
 from constants import NO_CACHE_VIDEO_URL
 from debrid.base_debrid import BaseDebrid
+from models.torrent_file import TorrentFile
+from torrent.torrent_file_index import torrent_file_index
 from utils.general import get_info_hash_from_magnet
 from utils.general import is_video_file
-from utils.general import season_episode_in_filename
+from utils.season_episode import match_episode_files
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -112,7 +114,7 @@ class RealDebrid(BaseDebrid):
                 return "Error: Failed to get torrent info."
 
             logger.info("Selecting file")
-            self.__select_file(torrent_info, stream_type, file_index, season, episode)
+            self.__select_file(torrent_info, info_hash, stream_type, file_index, season, episode)
 
             # == operator, to avoid adding the season pack twice and setting 5 as season pack treshold
             if len(cached_torrent_ids) == 0 and stream_type == "series" and len(torrent_info["files"]) > 5:
@@ -176,9 +178,8 @@ class RealDebrid(BaseDebrid):
             return False
 
         if file_index is None:
-            for file in torrent_info["files"]:
-                if file["selected"] and season_episode_in_filename(file['path'], season, episode):
-                    return True
+            selected_files = [file for file in torrent_info["files"] if file["selected"]]
+            return len(match_episode_files([file["path"] for file in selected_files], season, episode)) > 0
         else:
             for file in torrent_info["files"]:
                 if file['id'] == file_index:
@@ -199,7 +200,7 @@ class RealDebrid(BaseDebrid):
             torrent_id = magnet_response['id']
         else:
             logger.info(f"Downloading torrent file from Jackett")
-            torrent_file = self.donwload_torrent_file(torrent_download)
+            torrent_file = self.donwload_torrent_file(torrent_download, magnet)
             logger.info(f"Torrent file downloaded from Jackett")
 
             logger.info(f"Adding torrent file to RealDebrid")
@@ -226,7 +227,7 @@ class RealDebrid(BaseDebrid):
         time.sleep(10)
         return self.get_torrent_info(torrent_info["id"])
 
-    def __select_file(self, torrent_info, stream_type, file_index, season, episode):
+    def __select_file(self, torrent_info, info_hash, stream_type, file_index, season, episode):
         torrent_id = torrent_info["id"]
         if file_index is not None:
             logger.info(f"Selecting file_index: {file_index}")
@@ -239,20 +240,22 @@ class RealDebrid(BaseDebrid):
             logger.info(f"Selecting file_index: {largest_file_id}")
             self.select_files(torrent_id, largest_file_id)
         elif stream_type == "series":
-            strict_matching_files = []
-            matching_files = []
-            for file in files:
-                if season_episode_in_filename(file["path"], season, episode, strict=True):
-                    strict_matching_files.append(file)
-                elif season_episode_in_filename(file["path"], season, episode, strict=False):
-                    matching_files.append(file)
-
-            if len(strict_matching_files) > 0:
-                matching_files = strict_matching_files
-
-            largest_file_id = max(matching_files, key=lambda x: x['bytes'])['id']
-            logger.info(f"Selecting file_index: {largest_file_id}")
-            self.select_files(torrent_id, largest_file_id)
+            # The file ids of Real-Debrid are the indexes of the files in the torrent, the list is shared with the
+            # search (and the next episodes)
+            file_list = torrent_file_index.get(info_hash)
+            if file_list is None:
+                file_list = torrent_file_index.put_files(info_hash, [
+                    TorrentFile(file["id"], file["path"].lstrip("/"), file["path"].rsplit("/", 1)[-1], file["bytes"])
+                    for file in files
+                ])
+
+            episode_file = file_list.find_episode_file(season, episode)
+            if episode_file is None:
+                logger.error(f"No matching files for {season} {episode} in torrent.")
+                return
+
+            logger.info(f"Selecting file_index: {episode_file.index}")
+            self.select_files(torrent_id, episode_file.index)
 
     def __find_appropiate_link(self, torrent_info, links, file_index, season, episode):
         selected_files = list(filter(lambda file: file["selected"] == 1, torrent_info["files"]))
@@ -264,19 +267,12 @@ class RealDebrid(BaseDebrid):
                     break
                 index += 1
         else:
-            matching_indexes = []
-            strict_matching_indexes = []
-            for file in selected_files:
-                if season_episode_in_filename(file["path"], season, episode, strict=True):
-                    strict_matching_indexes.append({"index": index, "file": file})
-                elif season_episode_in_filename(file["path"], season, episode, strict=False):
-                    matching_indexes.append({"index": index, "file": file})
-                index += 1
-
-            if len(strict_matching_indexes) > 0:
-                matching_indexes = strict_matching_indexes
+            matching_indexes = match_episode_files([file["path"] for file in selected_files], season, episode)
+            if len(matching_indexes) == 0:
+                logger.debug(f"No matching files for {season} {episode} in {selected_files}.")
+                return NO_CACHE_VIDEO_URL
 
-            index = max(matching_indexes, lambda x: x["file"]["bytes"])["index"]
+            index = max(matching_indexes, key=lambda matching_index: selected_files[matching_index]["bytes"])
 
         if len(links) - 1 < index:
             logger.debug(f"From selected files {selected_files}, index: {index} is out of range for {links}.")
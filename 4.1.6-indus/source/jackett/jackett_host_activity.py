@@ -0,0 +1,26 @@
+import os
+import time
+
+# Seconds after which what was learned about the indexers of a Jackett host nobody searched with is dropped
+JACKETT_HOST_MAX_IDLE_TIME = int(os.getenv("JACKETT_HOST_STATE_MAX_IDLE_TIME", 86400))
+
+
+class JackettHostActivity:
+    """Last time each Jackett host was used, so that the state kept per host can be dropped once nobody searches with
+    it anymore. Any user can configure their own Jackett host, that state would otherwise grow forever."""
+
+    def __init__(self, max_idle_time):
+        self.__max_idle_time = max_idle_time
+        self.__used_at = dict()  # Jackett base url -> last time it was used
+
+    def touch(self, base_url):
+        self.__used_at[base_url] = time.time()
+
+    def pop_idle_hosts(self):
+        """Returns the hosts unused for longer than the max idle time, and forgets them."""
+        now = time.time()
+        idle_hosts = {base_url for base_url, used_at in self.__used_at.items() if now - used_at > self.__max_idle_time}
+        for base_url in idle_hosts:
+            del self.__used_at[base_url]
+
+        return idle_hosts
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from jackett.jackett_indexer import JackettIndexer
+from jackett.jackett_scheduler import jackett_scheduler
+from utils.logger import setup_logger
+
+
+class JackettIndexerCatalog:
+    """Cache of the configured indexers (and their search capabilities), per Jackett host and API key.
+
+    A stale catalog is still served while a refresh runs in the background, so asking Jackett for its indexers is
+    only on the critical path the very first time a host/API key pair is seen.
+    """
+
+    def __init__(self, ttl, max_idle_time, invalidation_cooldown):
+        self.logger = setup_logger(__name__)
+
+        self.__ttl = ttl
+        self.__max_idle_time = max_idle_time
+        self.__invalidation_cooldown = invalidation_cooldown
+        self.__entries = dict()  # (base_url, api_key) -> {"indexers", "updated_at", "used_at"}
+        self.__refresh_tasks = dict()  # (base_url, api_key) -> running refresh task
+
+    async def get_indexers(self, base_url, api_key):
+        key = (base_url, api_key)
+        entry = self.__entries.get(key)
+
+        if entry is None:
+            await self.__refresh(key)
+            entry = self.__entries.get(key)
+            if entry is None:
+                return []
+        elif time.time() - entry["updated_at"] > self.__ttl:
+            self.logger.info("Indexer catalog is stale, refreshing it in the background")
+            self.__refresh(key)
+
+        entry["used_at"] = time.time()
+        return entry["indexers"]
+
+    def invalidate(self, base_url, api_key):
+        key = (base_url, api_key)
+        entry = self.__entries.get(key)
+        if entry is None:
+            return
+
+        # An indexer that always rejects a query would otherwise refetch the catalog on every search, while a fresh
+        # catalog can't fix it
+        if time.time() - entry["updated_at"] < self.__invalidation_cooldown:
+            self.logger.debug("Indexer catalog was refreshed recently, not invalidating it")
+            return
+
+        self.logger.info("Indexer catalog invalidated, refreshing it in the background")
+        self.__refresh(key)
+
+    async def refresh_all(self):
+        now = time.time()
+        refreshes = []
+        for key, entry in list(self.__entries.items()):
+            if now - entry["used_at"] > self.__max_idle_time:
+                # Nobody searched with this Jackett for a long time, stop refreshing it
+                del self.__entries[key]
+            elif now - entry["updated_at"] > self.__ttl:
+                refreshes.append(self.__refresh(key))
+
+        # An unreachable Jackett host doesn't hold back the refresh of the others
+        await asyncio.gather(*refreshes, return_exceptions=True)
+
+    def __refresh(self, key):
+        # Concurrent refreshes of the same catalog share a single request to Jackett
+        if key not in self.__refresh_tasks:
+            task = asyncio.create_task(self.__fetch(key))
+            task.add_done_callback(lambda _: self.__refresh_tasks.pop(key, None))
+            self.__refresh_tasks[key] = task
+
+        return self.__refresh_tasks[key]
+
+    async def __fetch(self, key):
+        base_url, api_key = key
+        url = f"{base_url}/indexers/all/results/torznab/api?apikey={api_key}&t=indexers&configured=true"
+
+        try:
+            response = await jackett_scheduler.get(url)
+            response.raise_for_status()
+            indexers = self.__get_indexer_from_xml(response.text)
+        except Exception:
+            # Keep serving the previous catalog (if any) rather than no indexers at all
+            self.logger.exception("An exception occured while getting indexers from Jackett.")
+            return
+
+        previous_entry = self.__entries.get(key)
+        self.__entries[key] = {
+            "indexers": indexers,
+            "updated_at": time.time(),
+            "used_at": previous_entry["used_at"] if previous_entry is not None else time.time()
+        }
+        self.logger.info(f"Indexer catalog refreshed ({len(indexers)} indexers)")
+
+    def __get_indexer_from_xml(self, xml_content):
+        xml_root = ET.fromstring(xml_content)
+
+        indexer_list = []
+        for item in xml_root.findall('.//indexer'):
+            indexer = JackettIndexer()
+
+            indexer.title = item.find('title').text
+            indexer.id = item.attrib['id']
+            indexer.link = item.find('link').text
+            indexer.type = item.find('type').text
+            indexer.language = item.find('language').text.split('-')[0]
+
+            self.logger.debug(f"Indexer: {indexer.title} - {indexer.link} - {indexer.type}")
+
+            movie_search = item.find('.//searching/movie-search[@available="yes"]')
+            tv_search = item.find('.//searching/tv-search[@available="yes"]')
+
+            if movie_search is not None:
+                indexer.movie_search_capatabilities = movie_search.attrib['supportedParams'].split(',')
+            else:
+                self.logger.debug(f"Movie search not available for {indexer.title}")
+
+            if tv_search is not None:
+                indexer.tv_search_capatabilities = tv_search.attrib['supportedParams'].split(',')
+            else:
+                self.logger.debug(f"TV search not available for {indexer.title}")
+
+            indexer_list.append(indexer)
+
+        return indexer_list
+
+
+indexer_catalog = JackettIndexerCatalog(
+    int(os.getenv("JACKETT_INDEXERS_CACHE_TTL", 1800)),
+    int(os.getenv("JACKETT_INDEXERS_CACHE_MAX_IDLE_TIME", 86400)),
+    int(os.getenv("JACKETT_INDEXERS_INVALIDATION_COOLDOWN", 300))
+)
@@ -0,0 +1,151 @@
+import os
+import time
+from collections import deque
+
+from jackett.jackett_host_activity import JackettHostActivity, JACKETT_HOST_MAX_IDLE_TIME
+from utils.logger import setup_logger
+
+CLOSED = "closed"  # Indexer is healthy, requests go through
+OPEN = "open"  # Indexer is failing, requests are skipped until the cooldown is over
+HALF_OPEN = "half-open"  # Cooldown is over, a single probe request decides if the indexer is back
+
+
+class IndexerHealth:
+    def __init__(self, window_size):
+        self.latencies = deque(maxlen=window_size)  # Latency (in seconds) of the last successful requests
+        self.outcomes = deque(maxlen=window_size)  # True for a success, False for a failure
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self.cooldown = None
+        self.probe_started_at = None
+
+    def get_latency_percentile(self, percentile):
+        if len(self.latencies) == 0:
+            return None
+
+        latencies = sorted(self.latencies)
+        return latencies[int(percentile / 100 * (len(latencies) - 1))]
+
+    def get_error_rate(self):
+        if len(self.outcomes) == 0:
+            return 0
+
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class JackettIndexerHealth:
+    """Tracks latency and errors of every indexer, to skip the ones that are down and to size their timeouts.
+
+    Indexers are tracked per Jackett host: the same indexer id ("1337x") on another user's Jackett is another indexer,
+    one broken Jackett must not get it skipped for everybody.
+    """
+
+    def __init__(self, failure_threshold, cooldown, max_cooldown, default_timeout, min_timeout, max_idle_time):
+        self.logger = setup_logger(__name__)
+
+        self.__failure_threshold = failure_threshold
+        self.__cooldown = cooldown
+        self.__max_cooldown = max_cooldown
+        self.__default_timeout = default_timeout
+        self.__min_timeout = min_timeout
+        self.__window_size = 50
+        self.__min_samples = 10
+        self.__health = dict()  # (Jackett base url, indexer id) -> IndexerHealth
+        self.__host_activity = JackettHostActivity(max_idle_time)
+
+    def allow_request(self, base_url, indexer_id):
+        health = self.__get_health(base_url, indexer_id)
+
+        if health.state == OPEN:
+            if time.time() - health.opened_at < health.cooldown:
+                return False
+
+            # Let exactly one search through to probe the indexer
+            health.state = HALF_OPEN
+            health.probe_started_at = time.time()
+            return True
+
+        if health.state == HALF_OPEN and time.time() - health.probe_started_at > self.__default_timeout:
+            # The probe never reported back (cancelled, or answered from the cache), try another one
+            health.probe_started_at = time.time()
+            return True
+
+        return health.state == CLOSED
+
+    def get_timeout(self, base_url, indexer_id):
+        return self.__get_timeout(self.__get_health(base_url, indexer_id))
+
+    def record_success(self, base_url, indexer_id, latency):
+        health = self.__get_health(base_url, indexer_id)
+        health.latencies.append(latency)
+        health.outcomes.append(True)
+        health.consecutive_failures = 0
+
+        if health.state != CLOSED:
+            self.logger.info(f"Indexer {indexer_id} answered again, closing its circuit breaker")
+            health.state = CLOSED
+            health.cooldown = None
+
+    def record_failure(self, base_url, indexer_id):
+        health = self.__get_health(base_url, indexer_id)
+        health.outcomes.append(False)
+        health.consecutive_failures += 1
+
+        if health.state == HALF_OPEN:
+            # The probe failed, wait longer before the next one
+            self.__open(indexer_id, health, min(health.cooldown * 2, self.__max_cooldown))
+        elif health.state == CLOSED and health.consecutive_failures >= self.__failure_threshold:
+            self.__open(indexer_id, health, self.__cooldown)
+
+    def get_stats(self):
+        """Returns the health of every indexer, by Jackett base url then indexer id."""
+        stats = dict()
+        for (base_url, indexer_id), health in self.__health.items():
+            stats.setdefault(base_url, dict())[indexer_id] = {
+                "state": health.state,
+                "p50": health.get_latency_percentile(50),
+                "p95": health.get_latency_percentile(95),
+                "error_rate": health.get_error_rate(),
+                "timeout": self.__get_timeout(health)
+            }
+
+        return stats
+
+    def evict_idle(self):
+        """Drops the health of the indexers of the Jackett hosts nobody searched with for a long time."""
+        idle_hosts = self.__host_activity.pop_idle_hosts()
+        for key in [key for key in self.__health if key[0] in idle_hosts]:
+            del self.__health[key]
+
+    def __get_timeout(self, health):
+        if len(health.latencies) < self.__min_samples:
+            return self.__default_timeout
+
+        p95 = health.get_latency_percentile(95)
+        return min(max(p95 * 2, self.__min_timeout), self.__default_timeout)
+
+    def __open(self, indexer_id, health, cooldown):
+        self.logger.warning(f"Indexer {indexer_id} failed {health.consecutive_failures} times in a row, "
+                            f"skipping it for {cooldown} seconds")
+        health.state = OPEN
+        health.opened_at = time.time()
+        health.cooldown = cooldown
+
+    def __get_health(self, base_url, indexer_id):
+        self.__host_activity.touch(base_url)
+        key = (base_url, indexer_id)
+        if key not in self.__health:
+            self.__health[key] = IndexerHealth(self.__window_size)
+
+        return self.__health[key]
+
+
+indexer_health = JackettIndexerHealth(
+    int(os.getenv("JACKETT_CIRCUIT_BREAKER_THRESHOLD", 3)),
+    int(os.getenv("JACKETT_CIRCUIT_BREAKER_COOLDOWN", 300)),
+    int(os.getenv("JACKETT_CIRCUIT_BREAKER_MAX_COOLDOWN", 3600)),
+    float(os.getenv("JACKETT_REQUEST_TIMEOUT", 30)),
+    float(os.getenv("JACKETT_MIN_REQUEST_TIMEOUT", 2)),
+    JACKETT_HOST_MAX_IDLE_TIME
+)
@@ -0,0 +1,130 @@
+import os
+from collections import deque
+
+from jackett.jackett_host_activity import JackettHostActivity, JACKETT_HOST_MAX_IDLE_TIME
+from models.movie import Movie
+from utils.logger import setup_logger
+
+
+class PlannedQuery:
+    def __init__(self, indexer, language, title, imdb_id=None):
+        self.indexer = indexer
+        self.language = language  # Language of the title, used to learn which languages yield results
+        self.title = title
+        self.imdb_id = imdb_id  # Only set if the indexer supports searching by IMDB id
+
+    def to_dict(self):
+        return {
+            "indexer": self.indexer.id,
+            "language": self.language,
+            "title": self.title,
+            "imdbid": self.imdb_id
+        }
+
+    def __repr__(self):
+        return f"PlannedQuery({self.indexer.id}, {self.language}, {self.title!r}, imdbid={self.imdb_id})"
+
+
+class JackettQueryPlanner:
+    """Builds the smallest set of distinct (indexer, query) pairs needed to search a media.
+
+    The languages that yield results are learned per indexer of each Jackett host.
+    """
+
+    def __init__(self, window_size, min_samples, exploration_interval, max_idle_time):
+        self.logger = setup_logger(__name__)
+
+        self.__window_size = window_size
+        self.__min_samples = min_samples
+        self.__exploration_interval = exploration_interval
+        # (Jackett base url, indexer id, language) -> deque of booleans, True if the query yielded results
+        self.__yields = dict()
+        # (Jackett base url, indexer id, language) -> amount of searches where it was skipped
+        self.__skipped_searches = dict()
+        self.__host_activity = JackettHostActivity(max_idle_time)
+
+    def plan(self, media, indexers, base_url, record=True):
+        """Returns the queries to search the media with. Without record, nothing is learned from the plan (the
+        searches that skipped a language aren't counted), for plans that won't be searched."""
+        if record:
+            self.__host_activity.touch(base_url)
+
+        queries = []
+        for indexer in indexers:
+            queries.extend(self.__plan_indexer(media, indexer, base_url, record))
+
+        return queries
+
+    def record_yield(self, base_url, indexer_id, language, has_results):
+        self.__host_activity.touch(base_url)
+        key = (base_url, indexer_id, language)
+        if key not in self.__yields:
+            self.__yields[key] = deque(maxlen=self.__window_size)
+
+        self.__yields[key].append(has_results)
+
+    def evict_idle(self):
+        """Drops the languages learned for the indexers of the Jackett hosts nobody searched with for a long time."""
+        idle_hosts = self.__host_activity.pop_idle_hosts()
+        for learned in (self.__yields, self.__skipped_searches):
+            for key in [key for key in learned if key[0] in idle_hosts]:
+                del learned[key]
+
+    def __plan_indexer(self, media, indexer, base_url, record):
+        capabilities = indexer.movie_search_capatabilities if isinstance(media, Movie) \
+            else indexer.tv_search_capatabilities
+
+        if capabilities is None:
+            self.logger.debug(f"Not planning {indexer.title}, it can't search for a {media.type}")
+            return []
+
+        languages_and_titles = list(zip(media.languages, media.titles))
+
+        if os.getenv("DISABLE_JACKETT_IMDB_SEARCH") != "true" and 'imdbid' in capabilities:
+            # The IMDB id is enough to find the media, a single (english) title is plenty
+            english_titles = [title for language, title in languages_and_titles if language == 'en']
+            title = english_titles[0] if len(english_titles) > 0 else media.titles[0]
+            return [PlannedQuery(indexer, 'en', title, media.id)]
+
+        if indexer.language != "en":
+            languages_and_titles = [(language, title) for language, title in languages_and_titles
+                                    if language == indexer.language or language == 'en']
+
+        # Localized titles are often identical, searching them twice returns the same results
+        distinct_titles = dict()
+        for language, title in languages_and_titles:
+            normalized_title = title.strip().lower()
+            if normalized_title not in distinct_titles:
+                distinct_titles[normalized_title] = PlannedQuery(indexer, language, title)
+
+        queries = list(distinct_titles.values())
+        if len(queries) <= 1:
+            return queries
+
+        productive_queries = []
+        for query in queries:
+            key = (base_url, indexer.id, query.language)
+            if not self.__is_unproductive(key):
+                productive_queries.append(query)
+                continue
+
+            # Once in a while, try the language again in case the indexer content changed
+            skipped_searches = self.__skipped_searches.get(key, 0) + 1
+            if record:
+                self.__skipped_searches[key] = skipped_searches
+            if skipped_searches % self.__exploration_interval == 0:
+                productive_queries.append(query)
+
+        return productive_queries if len(productive_queries) > 0 else queries[:1]
+
+    def __is_unproductive(self, key):
+        yields = self.__yields.get(key)
+        return yields is not None and len(yields) >= self.__min_samples and True not in yields
+
+
+query_planner = JackettQueryPlanner(
+    20,
+    int(os.getenv("JACKETT_QUERY_PLANNER_MIN_SAMPLES", 5)),
+    int(os.getenv("JACKETT_QUERY_PLANNER_EXPLORATION_INTERVAL", 20)),
+    JACKETT_HOST_MAX_IDLE_TIME
+)
@@ -0,0 +1,68 @@
+import os
+from collections import deque
+
+from jackett.jackett_host_activity import JackettHostActivity, JACKETT_HOST_MAX_IDLE_TIME
+from utils.logger import setup_logger
+
+SPECULATIVE = "speculative"  # Episode and title queries are sent together, the title one is cancelled if not needed
+EPISODE_FIRST = "episode-first"  # The episode query almost always yields results, the title one is only a fallback
+TITLE_ONLY = "title-only"  # The episode query never yields results, it is skipped
+
+
+class JackettQueryStrategy:
+    """Learns, per indexer, which form of series query (episode or title only) actually yields results. Indexers are
+    told apart per Jackett host, another user's Jackett may be configured differently."""
+
+    def __init__(self, window_size, min_samples, exploration_interval, max_idle_time):
+        self.logger = setup_logger(__name__)
+
+        self.__window_size = window_size
+        self.__min_samples = min_samples
+        self.__exploration_interval = exploration_interval
+        # (Jackett base url, indexer id) -> deque of booleans, True if the episode query yielded results
+        self.__episode_hits = dict()
+        self.__title_only_searches = dict()  # (Jackett base url, indexer id) -> amount of searches done as title only
+        self.__host_activity = JackettHostActivity(max_idle_time)
+
+    def get_series_strategy(self, base_url, indexer_id):
+        self.__host_activity.touch(base_url)
+        key = (base_url, indexer_id)
+        hits = self.__episode_hits.get(key)
+        if hits is None or len(hits) < self.__min_samples:
+            return SPECULATIVE
+
+        hit_rate = hits.count(True) / len(hits)
+
+        if hit_rate == 0:
+            # Once in a while, try the episode query again in case the indexer started supporting it
+            searches = self.__title_only_searches.get(key, 0) + 1
+            self.__title_only_searches[key] = searches
+            return SPECULATIVE if searches % self.__exploration_interval == 0 else TITLE_ONLY
+
+        if hit_rate >= 0.8:
+            return EPISODE_FIRST
+
+        return SPECULATIVE
+
+    def record_episode_search(self, base_url, indexer_id, has_results):
+        self.__host_activity.touch(base_url)
+        key = (base_url, indexer_id)
+        if key not in self.__episode_hits:
+            self.__episode_hits[key] = deque(maxlen=self.__window_size)
+
+        self.__episode_hits[key].append(has_results)
+
+    def evict_idle(self):
+        """Drops what was learned about the indexers of the Jackett hosts nobody searched with for a long time."""
+        idle_hosts = self.__host_activity.pop_idle_hosts()
+        for learned in (self.__episode_hits, self.__title_only_searches):
+            for key in [key for key in learned if key[0] in idle_hosts]:
+                del learned[key]
+
+
+query_strategy = JackettQueryStrategy(
+    20,
+    int(os.getenv("JACKETT_QUERY_STRATEGY_MIN_SAMPLES", 5)),
+    int(os.getenv("JACKETT_QUERY_STRATEGY_EXPLORATION_INTERVAL", 20)),
+    JACKETT_HOST_MAX_IDLE_TIME
+)
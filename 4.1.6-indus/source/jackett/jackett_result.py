@@ -1,24 +1,28 @@
+import sys
+
 from models.series import Series
 from torrent.torrent_item import TorrentItem
+from utils.detection import detect_batch
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 class JackettResult:
+    __slots__ = ('title', 'size', 'link', 'indexer', 'seeders', 'magnet', 'info_hash', 'privacy', 'release_info',
+                 'type', 'season', 'episode')
+
     def __init__(self):
         self.title = None  # Title of the torrent
-        self.size = None  # Size of the torrent
+        self.size = None  # Size of the torrent in bytes (int)
         self.link = None  # Download link for the torrent file or magnet url
         self.indexer = None  # Indexer
-        self.seeders = None  # Seeders count
+        self.seeders = None  # Seeders count (int)
         self.magnet = None  # Magnet url
         self.info_hash = None  # infoHash by Jackett
         self.privacy = None  # public or private
 
         # Extra processed details for further filtering
-        self.languages = None  # Language of the torrent
-        self.quality = None  # Quality of the torrent
-        self.quality_spec = None  # Quality specifications of the torrent
+        self.release_info = None  # ReleaseInfo parsed from the title (quality, languages...)
         self.type = None  # series or movie
 
         # Not sure about these
@@ -33,9 +37,7 @@ class JackettResult:
             self.info_hash.lower() if self.info_hash is not None else None,
             self.link,
             self.seeders,
-            self.languages,
-            self.quality,
-            self.quality_spec,
+            self.release_info,
             self.indexer,
             self.privacy,
             self.episode,
@@ -51,11 +53,15 @@ class JackettResult:
         self.magnet = cached_item['magnet']
         self.link = cached_item['magnet']
         self.info_hash = cached_item['hash']
-        self.languages = cached_item['language'].split(";") if cached_item['language'] is not None else []
-        self.quality = cached_item['quality']
-        self.quality_spec = cached_item['qualitySpec'].split(";") if cached_item['qualitySpec'] is not None else []
-        self.seeders = cached_item['seeders']
-        self.size = cached_item['size']
+        self.release_info = detect_batch([self.title])[0]._replace(
+            quality=sys.intern(cached_item['quality']),
+            quality_spec=tuple(map(sys.intern, cached_item['qualitySpec'].split(";")))
+            if cached_item['qualitySpec'] is not None else (),
+            languages=tuple(map(sys.intern, cached_item['language'].split(";")))
+            if cached_item['language'] is not None else ()
+        )
+        self.seeders = int(cached_item['seeders'])
+        self.size = int(cached_item['size'])
 
         if isinstance(media, Series):
             self.season = media.season
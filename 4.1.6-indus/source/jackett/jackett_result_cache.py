@@ -0,0 +1,83 @@
+import datetime
+import os
+import time
+from collections import OrderedDict
+
+from utils.logger import setup_logger
+
+
+class JackettResultCache:
+    """In-process LRU cache of indexer responses, keyed by the normalized torznab query.
+
+    Entries live for a TTL that depends on how old the searched media is: results for new releases change quickly,
+    results for older titles hardly ever do. Empty responses are cached too, for a shorter time. Once expired, an
+    entry can still be served for a while as long as somebody revalidates it in the background.
+    """
+
+    def __init__(self, new_release_ttl, catalog_ttl, empty_ttl, stale_ttl, max_size):
+        self.logger = setup_logger(__name__)
+
+        self.__new_release_ttl = new_release_ttl
+        self.__catalog_ttl = catalog_ttl
+        self.__empty_ttl = empty_ttl
+        self.__stale_ttl = stale_ttl
+        self.__max_size = max_size
+        self.__entries = OrderedDict()  # query -> (items, expires_at)
+        self.__revalidating = set()  # queries being refreshed in the background
+
+    def get_ttl(self, media, items):
+        if len(items) == 0:
+            return self.__empty_ttl
+
+        # Media without a known year are considered as new, series that are still airing don't have one
+        year = getattr(media, 'year', None)
+        if year is None or not str(year).isdigit():
+            return self.__new_release_ttl
+
+        if datetime.date.today().year - int(year) <= 1:
+            return self.__new_release_ttl
+
+        return self.__catalog_ttl
+
+    def get(self, key):
+        """Returns (items, is_stale) or None if the query is not cached."""
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+
+        items, expires_at = entry
+        now = time.time()
+        if now > expires_at + self.__stale_ttl:
+            del self.__entries[key]
+            return None
+
+        self.__entries.move_to_end(key)
+        return items, now > expires_at
+
+    def set(self, key, items, ttl):
+        self.__entries[key] = (items, time.time() + ttl)
+        self.__entries.move_to_end(key)
+        self.__revalidating.discard(key)
+
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+
+    def start_revalidation(self, key):
+        """Returns True if the caller should revalidate the query, False if somebody is already doing it."""
+        if key in self.__revalidating:
+            return False
+
+        self.__revalidating.add(key)
+        return True
+
+    def end_revalidation(self, key):
+        self.__revalidating.discard(key)
+
+
+jackett_result_cache = JackettResultCache(
+    int(os.getenv("JACKETT_RESULTS_CACHE_TTL_NEW_RELEASES", 600)),
+    int(os.getenv("JACKETT_RESULTS_CACHE_TTL_CATALOG", 21600)),
+    int(os.getenv("JACKETT_RESULTS_CACHE_TTL_EMPTY", 300)),
+    int(os.getenv("JACKETT_RESULTS_CACHE_STALE_TTL", 3600)),
+    int(os.getenv("JACKETT_RESULTS_CACHE_SIZE", 2000))
+)
@@ -0,0 +1,59 @@
+import asyncio
+import contextlib
+import os
+
+import httpx
+
+from jackett.jackett_host_activity import JackettHostActivity, JACKETT_HOST_MAX_IDLE_TIME
+from utils.logger import setup_logger
+
+
+class JackettScheduler:
+    """Process-wide gate for every request sent to Jackett.
+
+    All searches share the same HTTP client and the same concurrency budget, so the amount of in-flight requests
+    stays bounded no matter how many Stremio clients are searching at the same time. Each indexer of each Jackett host
+    additionally gets its own (smaller) budget so a single slow indexer cannot take all the slots.
+    """
+
+    def __init__(self, max_concurrency, max_concurrency_per_indexer, max_idle_time):
+        self.logger = setup_logger(__name__)
+
+        self.__slots = asyncio.Semaphore(max_concurrency)
+        self.__max_concurrency_per_indexer = max_concurrency_per_indexer
+        self.__indexer_slots = dict()  # (Jackett base url, indexer id) -> Semaphore
+        self.__host_activity = JackettHostActivity(max_idle_time)
+        self.__client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=None
+        )
+
+    async def get(self, url, indexer_key=None, timeout=None):
+        """indexer_key is the (Jackett base url, indexer id) the request goes to, None for requests to Jackett itself."""
+        # The indexer slot is taken first, so waiting for a busy indexer never holds one of the global slots
+        async with self.__get_indexer_slots(indexer_key):
+            async with self.__slots:
+                return await self.__client.get(url, timeout=timeout)
+
+    def evict_idle(self):
+        """Drops the indexer slots of the Jackett hosts nobody searched with for a long time."""
+        idle_hosts = self.__host_activity.pop_idle_hosts()
+        for key in [key for key in self.__indexer_slots if key[0] in idle_hosts]:
+            del self.__indexer_slots[key]
+
+    def __get_indexer_slots(self, indexer_key):
+        if indexer_key is None:
+            return contextlib.nullcontext()
+
+        self.__host_activity.touch(indexer_key[0])
+        if indexer_key not in self.__indexer_slots:
+            self.__indexer_slots[indexer_key] = asyncio.Semaphore(self.__max_concurrency_per_indexer)
+
+        return self.__indexer_slots[indexer_key]
+
+
+jackett_scheduler = JackettScheduler(
+    int(os.getenv("JACKETT_MAX_CONCURRENT_REQUESTS", 64)),
+    int(os.getenv("JACKETT_MAX_CONCURRENT_REQUESTS_PER_INDEXER", 4)),
+    JACKETT_HOST_MAX_IDLE_TIME
+)
@@ -1,18 +1,35 @@
+import asyncio
+import hashlib
 import os
-import queue
-import threading
 import time
 import xml.etree.ElementTree as ET
 
-import requests
-
-from jackett.jackett_indexer import JackettIndexer
+from jackett.jackett_indexer_catalog import indexer_catalog
+from jackett.jackett_indexer_health import indexer_health
+from jackett.jackett_query_planner import query_planner
+from jackett.jackett_query_strategy import query_strategy, SPECULATIVE, TITLE_ONLY
 from jackett.jackett_result import JackettResult
+from jackett.jackett_result_cache import jackett_result_cache
+from jackett.jackett_scheduler import jackett_scheduler
+from jackett.torznab_parser import parse_torznab_items
 from models.movie import Movie
 from models.series import Series
 from utils import detection
+from utils.executors import get_executor, CPU
 from utils.logger import setup_logger
 
+# Torznab error codes: missing parameter, incorrect parameter, no such function, function not available
+CAPABILITY_ERROR_CODES = {'200', '201', '202', '203'}
+
+SEARCH_DEADLINE = float(os.getenv("JACKETT_SEARCH_DEADLINE", 4))
+
+# Searches still running after the deadline, they are only kept around to fill the result cache
+background_searches = set()
+
+
+class JackettCapabilityError(Exception):
+    pass
+
 
 class JackettService:
     def __init__(self, config):
@@ -20,251 +37,266 @@ class JackettService:
 
         self.__api_key = config['jackettApiKey']
         self.__base_url = f"{config['jackettHost']}/api/v2.0"
-        self.__session = requests.Session()
+        # Cached results are only served to requests with the same API key, the key itself isn't kept in the cache
+        self.__api_key_hash = hashlib.sha256(str(self.__api_key).encode()).hexdigest()
+
+        self.cut_off_indexers = []  # Indexers that didn't answer before the search deadline
+
+    async def search(self, media):
+        return [result async for results in self.search_iter(media) for result in results]
 
-    def search(self, media):
+    async def search_iter(self, media):
+        """Yields the (post-processed) results of each indexer as soon as it answers."""
         self.logger.info("Started Jackett search for " + media.type + " " + media.titles[0])
+        deadline = time.time() + SEARCH_DEADLINE
 
-        indexers = self.__get_indexers()
-        threads = []
-        results_queue = queue.Queue()  # Create a Queue instance to hold the results
+        indexers = await indexer_catalog.get_indexers(self.__base_url, self.__api_key)
+        skipped_indexers = [indexer for indexer in indexers
+                            if not indexer_health.allow_request(self.__base_url, indexer.id)]
+        if len(skipped_indexers) > 0:
+            self.logger.info(f"Skipping unhealthy indexers: {', '.join(indexer.title for indexer in skipped_indexers)}")
+            indexers = [indexer for indexer in indexers if indexer not in skipped_indexers]
 
-        # Define a wrapper function that calls the actual target function and stores its return value in the queue
-        def thread_target(media, indexer):
-            self.logger.info(f"Searching on {indexer.title}")
-            start_time = time.time()
+        plan = self.__plan(media, indexers)
+        tasks = {asyncio.create_task(self.__search_indexer(media, indexer, queries)): indexer
+                 for indexer, queries in plan.items()}
 
-            # Call the actual function
-            if isinstance(media, Movie):
-                result = self.__search_movie_indexer(media, indexer)
-            elif isinstance(media, Series):
-                result = self.__search_series_indexer(media, indexer)
-            else:
-                raise TypeError("Only Movie and Series is allowed as media!")
+        pending = set(tasks)
+        try:
+            while len(pending) > 0:
+                done, pending = await asyncio.wait(pending, timeout=max(deadline - time.time(), 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if len(done) == 0:
+                    break
+
+                for task in done:
+                    yield self.__post_process_results([result for sublist in task.result() for result in sublist],
+                                                      media)
+        except BaseException:
+            # If the search itself is cancelled (or fails), don't leave the other indexers running
+            for task in tasks:
+                task.cancel()
+            raise
+
+        self.cut_off_indexers = [tasks[task] for task in pending]
+        if len(pending) > 0:
+            self.logger.warning(f"Search deadline reached, continuing without: "
+                                f"{', '.join(indexer.title for indexer in self.cut_off_indexers)}")
+
+        for task in pending:
+            background_searches.add(task)
+            task.add_done_callback(background_searches.discard)
+
+    async def plan(self, media):
+        """Returns the queries a search for the media would send, for debugging purposes."""
+        indexers = await indexer_catalog.get_indexers(self.__base_url, self.__api_key)
+        return [query.to_dict() for queries in self.__plan(media, indexers, record=False).values() for query in queries]
+
+    def __plan(self, media, indexers, record=True):
+        plan = dict()
+        for query in query_planner.plan(media, indexers, self.__base_url, record):
+            self.logger.debug(f"Planned {query}")
+            plan.setdefault(query.indexer, []).append(query)
+
+        return plan
+
+    async def __search_indexer(self, media, indexer, queries):
+        self.logger.info(f"Searching on {indexer.title}")
+        start_time = time.time()
+
+        if isinstance(media, Movie):
+            results = await asyncio.gather(*[self.__search_movie_query(media, query) for query in queries])
+        elif isinstance(media, Series):
+            results = await asyncio.gather(*[self.__search_series_query(media, query) for query in queries])
+        else:
+            raise TypeError("Only Movie and Series is allowed as media!")
 
-            self.logger.info(
-                f"Search on {indexer.title} took {time.time() - start_time} seconds and found {len(result)} results")
+        result = [query_results for query_results in results if query_results]
 
-            results_queue.put(result)  # Put the result in the queue
+        self.logger.info(
+            f"Search on {indexer.title} took {time.time() - start_time} seconds and found {len(result)} results")
 
-        for indexer in indexers:
-            # Pass the wrapper function as the target to Thread, with necessary arguments
-            threads.append(threading.Thread(target=thread_target, args=(media, indexer)))
+        return result
 
-        for thread in threads:
-            thread.start()
+    async def __search_movie_query(self, movie, query):
+        params = {
+            'apikey': self.__api_key,
+            't': 'movie',
+            'cat': '2000',
+            'q': query.title,
+            'year': movie.year,
+        }
 
-        for thread in threads:
-            thread.join()
+        if query.imdb_id is not None:
+            params['imdbid'] = query.imdb_id
 
-        results = []
+        try:
+            items = await self.__fetch(query.indexer, params, movie)
+            query_planner.record_yield(self.__base_url, query.indexer.id, query.language, len(items) > 0)
+            return self.__get_torrent_links_from_items(items)
+        except JackettCapabilityError as e:
+            self.__on_capability_error(query.indexer, e)
+        except Exception:
+            self.logger.exception(
+                f"An exception occured while searching for a movie on Jackett with indexer {query.indexer.title} and "
+                f"language {query.language}.")
 
-        # Retrieve results from the queue and append them to the results list
-        while not results_queue.empty():
-            results.extend(results_queue.get())
+        return None
 
-        flatten_results = [result for sublist in results for result in sublist]
+    async def __search_series_query(self, series, query):
+        episode = str(int(series.episode.replace('E', '')))
 
-        return self.__post_process_results(flatten_results, media)
+        params = {
+            'apikey': self.__api_key,
+            't': 'tvsearch',
+            'cat': '5000',
+            'q': query.title,
+        }
 
-    def __search_movie_indexer(self, movie, indexer):
+        if query.imdb_id is not None:
+            params['imdbid'] = query.imdb_id
 
-        # url = f"{self.__base_url}/indexers/all/results/torznab/api?apikey={self.__api_key}&t=movie&cat=2000&q={movie.title}&year={movie.year}"
+        params_ep = dict(params, ep=episode)
 
-        has_imdb_search_capability = (os.getenv(
-            "DISABLE_JACKETT_IMDB_SEARCH") != "true" and indexer.movie_search_capatabilities is not None and 'imdbid' in indexer.movie_search_capatabilities)
+        try:
+            items = await self.__search_episode_or_title(query.indexer, params_ep, params, series)
+            query_planner.record_yield(self.__base_url, query.indexer.id, query.language, len(items) > 0)
+            return self.__get_torrent_links_from_items(items)
+        except JackettCapabilityError as e:
+            self.__on_capability_error(query.indexer, e)
+        except Exception:
+            self.logger.exception(
+                f"An exception occurred while searching for a series on Jackett with indexer {query.indexer.title} "
+                f"and language {query.language}.")
 
-        if has_imdb_search_capability:
-            languages = ['en']
-            index_of_language = [index for index, lang in enumerate(movie.languages) if lang == 'en'][0]
-            titles = [movie.titles[index_of_language]]
-        elif indexer.language == "en":
-            languages = movie.languages
-            titles = movie.titles
-        else:
-            index_of_language = [index for index, lang in enumerate(movie.languages) if lang == indexer.language or lang == 'en']
-            languages = [movie.languages[index] for index in index_of_language]
-            titles = [movie.titles[index] for index in index_of_language]
-
-        results = []
-
-        for index, lang in enumerate(languages):
-            params = {
-                'apikey': self.__api_key,
-                't': 'movie',
-                'cat': '2000',
-                'q': titles[index],
-                'year': movie.year,
-            }
-
-            if has_imdb_search_capability:
-                params['imdbid'] = movie.id
-
-            url = f"{self.__base_url}/indexers/{indexer.id}/results/torznab/api"
-            url += '?' + '&'.join([f'{k}={v}' for k, v in params.items()])
-
-            try:
-                response = self.__session.get(url)
-                response.raise_for_status()
-                results.append(self.__get_torrent_links_from_xml(response.text))
-            except Exception:
-                self.logger.exception(
-                    f"An exception occured while searching for a movie on Jackett with indexer {indexer.title} and "
-                    f"language {lang}.")
+        return None
 
-        return results
+    async def __search_episode_or_title(self, indexer, params_ep, params_title, series):
+        # The title query is only used when the episode query doesn't return anything
+        strategy = query_strategy.get_series_strategy(self.__base_url, indexer.id)
+        if strategy == TITLE_ONLY:
+            return await self.__fetch(indexer, params_title, series)
 
-    def __search_series_indexer(self, series, indexer):
-        season = str(int(series.season.replace('S', '')))
-        episode = str(int(series.episode.replace('E', '')))
+        title_task = None
+        if strategy == SPECULATIVE:
+            title_task = asyncio.create_task(self.__fetch(indexer, params_title, series))
+            # The task may be dropped without being awaited, don't let its exception be reported as never retrieved
+            title_task.add_done_callback(lambda task: task.cancelled() or task.exception())
 
-        has_imdb_search_capability = (os.getenv("DISABLE_JACKETT_IMDB_SEARCH") != "true"
-                                    and indexer.tv_search_capatabilities is not None
-                                    and 'imdbid' in indexer.tv_search_capatabilities)
-        if has_imdb_search_capability:
-            languages = ['en']
-            index_of_language = [index for index, lang in enumerate(series.languages) if lang == 'en'][0]
-            titles = [series.titles[index_of_language]]
-        elif indexer.language == "en":
-            languages = series.languages
-            titles = series.titles
-        else:
-            index_of_language = [index for index, lang in enumerate(series.languages) if
-                                lang == indexer.language or lang == 'en']
-            languages = [series.languages[index] for index in index_of_language]
-            titles = [series.titles[index] for index in index_of_language]
-
-        results = []
-
-        for index, lang in enumerate(languages):
-            params = {
-                'apikey': self.__api_key,
-                't': 'tvsearch',
-                'cat': '5000',
-                'q': titles[index],
-            }
-
-            if has_imdb_search_capability:
-                params['imdbid'] = series.id
-
-            url_title = f"{self.__base_url}/indexers/{indexer.id}/results/torznab/api"
-            url_title += '?' + '&'.join([f'{k}={v}' for k, v in params.items()])
-
-            url_ep = f"{self.__base_url}/indexers/{indexer.id}/results/torznab/api"
-            params['ep'] = episode
-            url_ep += '?' + '&'.join([f'{k}={v}' for k, v in params.items()])
-
-            try:
-                response_ep = self.__session.get(url_ep)
-                response_ep.raise_for_status()
-                data_ep = self.__get_torrent_links_from_xml(response_ep.text)
-                if data_ep:
-                    results.append(data_ep)
-
-                # Optionally check for season if you uncomment this part
-                # response_season = self.__session.get(url_season)
-                # response_season.raise_for_status()
-                # data_season = self.__get_torrent_links_from_xml(response_season.text)
-                # if data_season:
-                #     results.append(data_season)
-
-                # If no data found in episode search, search by title
-                if not data_ep:
-                    response_title = self.__session.get(url_title)
-                    response_title.raise_for_status()
-                    data_title = self.__get_torrent_links_from_xml(response_title.text)
-                    if data_title:
-                        results.append(data_title)
-            except Exception:
-                self.logger.exception(
-                    f"An exception occurred while searching for a series on Jackett with indexer {indexer.title} and language {lang}.")
+        try:
+            episode_items = await self.__fetch(indexer, params_ep, series)
+        except BaseException:
+            if title_task is not None:
+                title_task.cancel()
+            raise
 
-        return results
+        query_strategy.record_episode_search(self.__base_url, indexer.id, len(episode_items) > 0)
 
-    def __get_indexers(self):
-        url = f"{self.__base_url}/indexers/all/results/torznab/api?apikey={self.__api_key}&t=indexers&configured=true"
+        if len(episode_items) > 0:
+            if title_task is not None:
+                title_task.cancel()
+            return episode_items
 
-        try:
-            response = self.__session.get(url)
-            response.raise_for_status()
-            return self.__get_indexer_from_xml(response.text)
-        except Exception:
-            self.logger.exception("An exception occured while getting indexers from Jackett.")
-            return []
+        if title_task is not None:
+            return await title_task
 
-    def __get_indexer_from_xml(self, xml_content):
-        xml_root = ET.fromstring(xml_content)
+        return await self.__fetch(indexer, params_title, series)
 
-        indexer_list = []
-        for item in xml_root.findall('.//indexer'):
-            indexer = JackettIndexer()
+    async def __fetch(self, indexer, params, media):
+        key = self.__get_cache_key(indexer, params)
 
-            indexer.title = item.find('title').text
-            indexer.id = item.attrib['id']
-            indexer.link = item.find('link').text
-            indexer.type = item.find('type').text
-            indexer.language = item.find('language').text.split('-')[0]
+        cached = jackett_result_cache.get(key)
+        if cached is not None:
+            items, is_stale = cached
+            if is_stale and jackett_result_cache.start_revalidation(key):
+                # Serve the stale items right away, the next searches will get the fresh ones
+                task = asyncio.create_task(self.__revalidate(indexer, params, media, key))
+                background_searches.add(task)
+                task.add_done_callback(background_searches.discard)
+            return items
 
-            self.logger.info(f"Indexer: {indexer.title} - {indexer.link} - {indexer.type}")
+        return await self.__request(indexer, params, media, key)
 
-            movie_search = item.find('.//searching/movie-search[@available="yes"]')
-            tv_search = item.find('.//searching/tv-search[@available="yes"]')
+    async def __revalidate(self, indexer, params, media, key):
+        try:
+            await self.__request(indexer, params, media, key)
+        except Exception:
+            self.logger.warning(f"Couldn't revalidate cached results of {indexer.title}")
+        finally:
+            jackett_result_cache.end_revalidation(key)
 
-            if movie_search is not None:
-                indexer.movie_search_capatabilities = movie_search.attrib['supportedParams'].split(',')
-            else:
-                self.logger.info(f"Movie search not available for {indexer.title}")
+    async def __request(self, indexer, params, media, key):
+        url = f"{self.__base_url}/indexers/{indexer.id}/results/torznab/api"
+        url += '?' + '&'.join([f'{k}={v}' for k, v in params.items()])
 
-            if tv_search is not None:
-                indexer.tv_search_capatabilities = tv_search.attrib['supportedParams'].split(',')
-            else:
-                self.logger.info(f"TV search not available for {indexer.title}")
+        start_time = time.time()
+        try:
+            response = await jackett_scheduler.get(url, (self.__base_url, indexer.id),
+                                                   timeout=indexer_health.get_timeout(self.__base_url, indexer.id))
+            latency = time.time() - start_time
+            items = await get_executor(CPU).run(parse_torznab_items, self.__get_response_content(response))
+        except JackettCapabilityError:
+            # The indexer is up, it just doesn't support this search
+            indexer_health.record_success(self.__base_url, indexer.id, time.time() - start_time)
+            raise
+        except Exception:
+            indexer_health.record_failure(self.__base_url, indexer.id)
+            raise
 
-            indexer_list.append(indexer)
+        # Parsing time (and waiting for a CPU worker) is left out, it says nothing about the indexer
+        indexer_health.record_success(self.__base_url, indexer.id, latency)
+        jackett_result_cache.set(key, items, jackett_result_cache.get_ttl(media, items))
 
-        return indexer_list
+        return items
 
-    def __get_torrent_links_from_xml(self, xml_content):
-        xml_root = ET.fromstring(xml_content)
+    def __get_cache_key(self, indexer, params):
+        # With the API key, a request with a wrong (or no) key is never answered from the results of a valid one
+        year = params.get('year')
+        return (self.__base_url, self.__api_key_hash, indexer.id, params['t'], params['cat'], params['q'].strip().lower(),
+                str(year) if year is not None else None, params.get('ep'), params.get('imdbid'))
 
-        result_list = []
-        for item in xml_root.findall('.//item'):
-            result = JackettResult()
+    def __on_capability_error(self, indexer, error):
+        # The capabilities we searched with are outdated, make sure the next searches use fresh ones
+        self.logger.warning(f"Indexer {indexer.title} rejected the search: {error}")
+        indexer_catalog.invalidate(self.__base_url, self.__api_key)
 
-            result.seeders = item.find('.//torznab:attr[@name="seeders"]',
-                                       namespaces={'torznab': 'http://torznab.com/schemas/2015/feed'}).attrib['value']
-            if int(result.seeders) <= 0:
-                continue
+    def __get_response_content(self, response):
+        # Jackett answers searches an indexer doesn't support with a torznab <error> document
+        if '<error' in response.text[:256]:
+            xml_root = ET.fromstring(response.text)
+            if xml_root.tag == 'error' and xml_root.attrib.get('code') in CAPABILITY_ERROR_CODES:
+                raise JackettCapabilityError(xml_root.attrib.get('description'))
 
-            result.title = item.find('title').text
-            result.size = item.find('size').text
-            result.link = item.find('link').text
-            result.indexer = item.find('jackettindexer').text
-            result.privacy = item.find('type').text
+        response.raise_for_status()
+        return response.text
 
-            # TODO: I haven't seen this in the Jackett XML response. Is this still relevant?
-            # Or which indexers provide this?
-            magnet = item.find('.//torznab:attr[@name="magneturl"]',
-                               namespaces={'torznab': 'http://torznab.com/schemas/2015/feed'})
-            result.magnet = magnet.attrib['value'] if magnet is not None else None
+    def __get_torrent_links_from_items(self, items):
+        result_list = []
+        for item in items:
+            result = JackettResult()
 
-            infoHash = item.find('.//torznab:attr[@name="infohash"]',
-                                 namespaces={'torznab': 'http://torznab.com/schemas/2015/feed'})
-            result.info_hash = infoHash.attrib['value'] if infoHash is not None else None
+            result.title = item.title
+            result.size = item.size
+            result.link = item.link
+            result.indexer = item.indexer
+            result.privacy = item.privacy
+            result.seeders = item.seeders
+            result.magnet = item.magnet
+            result.info_hash = item.info_hash
 
             result_list.append(result)
 
         return result_list
 
     def __post_process_results(self, results, media):
-        for result in results:
-            result.languages = detection.detect_languages(result.title)
-            result.quality = detection.detect_quality(result.title)
-            result.quality_spec = detection.detect_quality_spec(result.title)
+        release_infos = detection.detect_batch([result.title for result in results])
+        for result, release_info in zip(results, release_infos):
+            result.release_info = release_info
             result.type = media.type
 
             if isinstance(media, Series):
                 result.season = media.season
                 result.episode = media.episode
 
+        self.logger.debug(f"Release detection cache: {detection.get_detection_cache_stats()}")
         return results
@@ -0,0 +1,77 @@
+import sys
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+TORZNAB_ATTR = '{http://torznab.com/schemas/2015/feed}attr'
+CHUNK_SIZE = 64 * 1024
+
+# Raw, immutable view of a torznab <item>. It's cheap to build and safe to share between requests (through the
+# result cache), JackettResult objects are only created from the items that survive filtering.
+# size and seeders are ints, indexer and privacy are interned (the same few values come back in every response).
+TorznabItem = namedtuple('TorznabItem', ['title', 'size', 'link', 'indexer', 'privacy', 'seeders', 'magnet',
+                                         'info_hash'])
+
+
+def parse_torznab_items(xml_content):
+    """Parses a torznab response incrementally, dropping items without seeders on the way."""
+    parser = ET.XMLPullParser(events=('end',))
+
+    items = []
+    for start in range(0, len(xml_content), CHUNK_SIZE):
+        parser.feed(xml_content[start:start + CHUNK_SIZE])
+        read_torznab_items(parser, items)
+
+    parser.close()
+    read_torznab_items(parser, items)
+
+    return items
+
+
+def read_torznab_items(parser, items):
+    for _, element in parser.read_events():
+        if element.tag != 'item':
+            continue
+
+        item = read_torznab_item(element)
+        if item is not None:
+            items.append(item)
+
+        # Children of processed items are not needed anymore
+        element.clear()
+
+
+def read_torznab_item(element):
+    title = size = link = indexer = privacy = seeders = magnet = info_hash = None
+
+    # Single pass over the children instead of one lookup per field
+    for child in element:
+        tag = child.tag
+        if tag == TORZNAB_ATTR:
+            name = child.get('name')
+            if name == 'seeders':
+                seeders = child.get('value')
+            elif name == 'magneturl':
+                magnet = child.get('value')
+            elif name == 'infohash':
+                info_hash = child.get('value')
+        elif tag == 'title':
+            title = child.text
+        elif tag == 'size':
+            size = child.text
+        elif tag == 'link':
+            link = child.text
+        elif tag == 'jackettindexer':
+            indexer = child.text
+        elif tag == 'type':
+            privacy = child.text
+
+    if seeders is None:
+        return None
+
+    seeders = int(seeders)
+    if seeders <= 0:
+        return None
+
+    return TorznabItem(title, int(size) if size is not None else None, link,
+                       sys.intern(indexer) if indexer is not None else None,
+                       sys.intern(privacy) if privacy is not None else None, seeders, magnet, info_hash)
@@ -1,4 +1,6 @@
 import asyncio
+import copy
+import json
 import logging
 import os
 import re
@@ -10,24 +12,32 @@ import requests
 import starlette.status as status
 from aiocron import crontab
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from starlette.responses import FileResponse
 
 from debrid.get_debrid_service import get_debrid_service
+from jackett.jackett_indexer_catalog import indexer_catalog
+from jackett.jackett_indexer_health import indexer_health
+from jackett.jackett_query_planner import query_planner
+from jackett.jackett_query_strategy import query_strategy
 from jackett.jackett_result import JackettResult
+from jackett.jackett_scheduler import jackett_scheduler
 from jackett.jackett_service import JackettService
 from metdata.cinemeta import Cinemeta
 from metdata.tmdb import TMDB
 from torrent.torrent_service import TorrentService
 from torrent.torrent_smart_container import TorrentSmartContainer
 from utils.cache import search_cache
+from utils.deduplication import ResultDeduplicator
+from utils.executors import get_executor, get_executors_stats, NETWORK
 from utils.filter_results import filter_items
-from utils.filter_results import sort_items
 from utils.logger import setup_logger
+from utils.ranking import rank_items, rank_candidates
 from utils.parse_config import parse_config
+from utils.single_flight import SingleFlight
 from utils.stremio_parser import parse_to_stremio_streams
 from utils.string_encoding import decodeb64
 
@@ -41,6 +51,8 @@ app = FastAPI(root_path=root_path)
 VERSION = "4.11.6"
 isDev = os.getenv("NODE_ENV") == "development"
 COMMUNITY_VERSION = True if os.getenv("IS_COMMUNITY_VERSION") == "true" else False
+# Only download the torrent files of the best results, until enough of them are playable
+LAZY_TORRENT_RESOLUTION = os.getenv("LAZY_TORRENT_RESOLUTION") == "true"
 
 
 class LogFilterMiddleware:
@@ -122,19 +134,21 @@ logger.info("\n" +
 "---------------------------------------------"+ "\n")
 
 
-@app.get("/{config}/stream/{stream_type}/{stream_id}")
-async def get_results(config: str, stream_type: str, stream_id: str, request: Request):
-    start = time.time()
-    stream_id = stream_id.replace(".json", "")
+# Config fields that change the search results, requests only differing by other fields share the same search
+SHARED_SEARCH_CONFIG_KEYS = ['metadataProvider', 'tmdbApi', 'languages', 'jackettHost', 'jackettApiKey',
+                             'exclusionKeywords', 'exclusion', 'maxSize', 'resultsPerQuality']
+if LAZY_TORRENT_RESOLUTION:
+    # Which torrents get resolved depends on how the results are ranked
+    SHARED_SEARCH_CONFIG_KEYS += ['maxResults', 'sort', 'debrid', 'torrenting']
+
+search_flights = SingleFlight()
+
+
+def get_search_key(stream_type, stream_id, config):
+    return json.dumps([stream_type, stream_id] + [config.get(key) for key in SHARED_SEARCH_CONFIG_KEYS])
 
-    logger.info("stream_id: "+ stream_id + "\n")
-    logger.info("stream_type: "+ stream_type + "\n")   
-    
-    logger.info("Getting stream_id")
-    config = parse_config(config)
-    config1=config
-    logger.info("config: "+ config1[:20] + "...\n")
 
+def get_media(config, stream_type, stream_id):
     logger.info(f"Getting media info from {config['metadataProvider']}")
     if config['metadataProvider'] == "tmdb" and config['tmdbApi']:
         metadata_provider = TMDB(config)
@@ -143,7 +157,13 @@ async def get_results(config: str, stream_type: str, stream_id: str, request: Re
     media = metadata_provider.get_metadata(stream_id, stream_type)
     logger.info("Got media and properties: " + str(media.titles))
 
-    debrid_service = get_debrid_service(config)
+    return media
+
+
+async def search_torrents(config, stream_type, stream_id):
+    # Metadata providers and debrid services are called with requests, off the event loop running the searches
+    network_executor = get_executor(NETWORK)
+    media = await network_executor.run(get_media, config, stream_type, stream_id)
 
     search_results = []
     #if COMMUNITY_VERSION or config['cache']:
@@ -168,27 +188,81 @@ async def get_results(config: str, stream_type: str, stream_id: str, request: Re
 
     logger.info("Searching for results on Jackett")
     jackett_service = JackettService(config)
-    jackett_search_results = jackett_service.search(media)
-    logger.info("Got " + str(len(jackett_search_results)) + " results from Jackett")
-
-    logger.info("Filtering Jackett results")
-    filtered_jackett_search_results = filter_items(jackett_search_results, media, config=config)
-    logger.info("Filtered Jackett results")
+    torrent_service = TorrentService()
 
-    search_results.extend(filtered_jackett_search_results)
+    # The same release is often found on several indexers, its torrent is only resolved once
+    deduplicator = ResultDeduplicator()
 
-    logger.debug("Converting result to TorrentItems (results: " + str(len(search_results)) + ")")
-    torrent_service = TorrentService()
-    torrent_results = torrent_service.convert_and_process(search_results)
+    # Each indexer's results are filtered and sent to torrent processing as soon as they arrive, so the slowest
+    # indexers overlap with the processing of the fastest ones
+    torrent_processing = []
+    try:
+        async for jackett_search_results in jackett_service.search_iter(media):
+            logger.info("Got " + str(len(jackett_search_results)) + " results from Jackett")
+
+            logger.info("Filtering Jackett results")
+            filtered_jackett_search_results = filter_items(jackett_search_results, media, config=config)
+            logger.info("Filtered Jackett results")
+
+            new_search_results = deduplicator.add(filtered_jackett_search_results)
+            search_results.extend(new_search_results)
+
+            if not LAZY_TORRENT_RESOLUTION:
+                logger.debug("Converting result to TorrentItems (results: " + str(len(new_search_results)) + ")")
+                torrent_processing.extend(asyncio.ensure_future(network_executor.run(torrent_service.process, result))
+                                          for result in new_search_results)
+    except BaseException:
+        # Nobody will wait for the torrents already sent to processing
+        for task in torrent_processing:
+            task.cancel()
+        await asyncio.gather(*torrent_processing, return_exceptions=True)
+        raise
+
+    logger.info(f"Skipped {deduplicator.duplicates} duplicate results")
+
+    if LAZY_TORRENT_RESOLUTION:
+        # Every result is needed to rank them, the torrents are resolved once all indexers answered
+        logger.debug("Converting ranked results to TorrentItems (results: " + str(len(search_results)) + ")")
+        search_results = [deduplicator.apply_best(result, result) for result in search_results]
+        candidates = rank_candidates(search_results, config)
+        torrent_results = await torrent_service.process_candidates(candidates, config)
+    else:
+        torrent_results = [deduplicator.apply_best(torrent_item, result)
+                           for torrent_item, result in zip(await asyncio.gather(*torrent_processing), search_results)]
     logger.debug("Converted result to TorrentItems (results: " + str(len(torrent_results)) + ")")
 
+    return media, torrent_results, jackett_service.cut_off_indexers
+
+
+@app.get("/{config}/stream/{stream_type}/{stream_id}")
+async def get_results(config: str, stream_type: str, stream_id: str, request: Request, response: Response):
+    start = time.time()
+    stream_id = stream_id.replace(".json", "")
+
+    logger.info("stream_id: "+ stream_id + "\n")
+    logger.info("stream_type: "+ stream_type + "\n")   
+    
+    logger.info("Getting stream_id")
+    logger.info("config: "+ config[:20] + "...\n")
+    config = parse_config(config)
+
+    debrid_service = get_debrid_service(config)
+
+    media, torrent_results, cut_off_indexers = await search_flights.do(
+        get_search_key(stream_type, stream_id, config), lambda: search_torrents(config, stream_type, stream_id))
+    if len(cut_off_indexers) > 0:
+        response.headers["X-Jackett-Cut-Off-Indexers"] = ",".join(indexer.id for indexer in cut_off_indexers)
+
+    # The search results may be shared with other requests, the next steps update the items for this user only
+    torrent_results = [copy.copy(torrent_item) for torrent_item in torrent_results]
+
     torrent_smart_container = TorrentSmartContainer(torrent_results, media)
 
     if config['debrid']:
         logger.debug("Checking availability")
         hashes = torrent_smart_container.get_hashes()
         ip = request.client.host
-        result = debrid_service.get_availability_bulk(hashes, ip)
+        result = await get_executor(NETWORK).run(debrid_service.get_availability_bulk, hashes, ip)
         torrent_smart_container.update_availability(result, type(debrid_service))
         logger.debug("Checked availability (results: " + str(len(result.items())) + ")")
 
@@ -197,7 +271,7 @@ async def get_results(config: str, stream_type: str, stream_id: str, request: Re
 
     logger.debug("Getting best matching results")
     best_matching_results = torrent_smart_container.get_best_matching()
-    best_matching_results = sort_items(best_matching_results, config)
+    best_matching_results = rank_items(best_matching_results, config, int(config['maxResults']))
     logger.debug("Got best matching results (results: " + str(len(best_matching_results)) + ")")
 
     logger.info("Processing results")
@@ -209,6 +283,18 @@ async def get_results(config: str, stream_type: str, stream_id: str, request: Re
     return {"streams": stream_list}
 
 
+if isDev:
+    @app.get("/{config}/plan/{stream_type}/{stream_id}")
+    async def get_search_plan(config: str, stream_type: str, stream_id: str):
+        config = parse_config(config)
+        media = await get_executor(NETWORK).run(get_media, config, stream_type, stream_id.replace(".json", ""))
+        return {"queries": await JackettService(config).plan(media)}
+
+    @app.get("/stats")
+    async def get_stats():
+        return {"indexers": indexer_health.get_stats(), "executors": get_executors_stats()}
+
+
 @app.get("/playback/{config}/{query}")
 async def get_playback(config: str, query: str, request: Request):
     try:
@@ -221,7 +307,7 @@ async def get_playback(config: str, query: str, request: Request):
         logger.info("Decoded query")
         ip = request.client.host
         debrid_service = get_debrid_service(config)
-        link = debrid_service.get_stream_link(query, ip)
+        link = await get_executor(NETWORK).run(debrid_service.get_stream_link, query, ip)
 
         logger.info("Got link: " + link)
         return RedirectResponse(url=link, status_code=status.HTTP_301_MOVED_PERMANENTLY)
@@ -242,7 +328,7 @@ async def get_playback(config: str, query: str, request: Request):
         logger.info("Decoded query")
         ip = request.client.host
         debrid_service = get_debrid_service(config)
-        link = debrid_service.get_stream_link(query, ip)
+        link = await get_executor(NETWORK).run(debrid_service.get_stream_link, query, ip)
 
         logger.info("Got link: " + link)
         return RedirectResponse(url=link, status_code=status.HTTP_301_MOVED_PERMANENTLY)
@@ -297,6 +383,21 @@ async def get_playback(config: str, query: str, request: Request):
 #    await update_app()
 
 
+# Catalogs older than their TTL are refreshed ahead of the next search, idle ones are dropped
+@crontab("*/10 * * * *")
+async def refresh_indexer_catalog():
+    await indexer_catalog.refresh_all()
+
+
+# What was learned about each indexer of a Jackett host is dropped once nobody searches with that host anymore
+@crontab("0 * * * *")
+async def evict_idle_jackett_hosts():
+    indexer_health.evict_idle()
+    jackett_scheduler.evict_idle()
+    query_planner.evict_idle()
+    query_strategy.evict_idle()
+
+
 async def main():
     await asyncio.gather(
         schedule_task()
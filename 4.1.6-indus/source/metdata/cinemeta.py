@@ -1,3 +1,5 @@
+import re
+
 import requests
 
 from metdata.metadata_provider_base import MetadataProvider
@@ -28,8 +30,20 @@ class Cinemeta(MetadataProvider):
                 titles=[self.replace_weird_characters(data["meta"]["name"])],
                 season="S{:02d}".format(int(full_id[1])),
                 episode="E{:02d}".format(int(full_id[2])),
-                languages=["en"]
+                languages=["en"],
+                year=self.__get_last_year(data["meta"].get("releaseInfo"))
             )
 
         self.logger.info("Got metadata for " + type + " with id " + id)
         return result
+
+    def __get_last_year(self, release_info):
+        # "2008-2013" for an ended series, "2019-" for a series that is still airing
+        if release_info is None:
+            return None
+
+        years = re.findall(r'\d{4}', release_info)
+        if len(years) == 0 or not release_info.rstrip()[-1].isdigit():
+            return None
+
+        return years[-1]
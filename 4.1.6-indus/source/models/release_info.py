@@ -0,0 +1,13 @@
+from collections import namedtuple
+
+# What the title of a release tells about it. It's parsed once, when the result comes in from Jackett, and read by
+# filtering, sorting and formatting. Immutable, so the torrent items of a shared search can safely hold the same one.
+#   quality: "4k", "1080p", "720p", "480p" or "Unknown"
+#   quality_spec: tuple of specs like ("HDR", "WEBDL"), empty if none was found
+#   languages: tuple of language codes like ("fr", "multi", "multi"), ("en",) if none was found
+#   seasons, episodes: frozensets of the season and episode numbers of the title, like {1} and {2, 3} for S01E02-E03,
+#       empty if the title doesn't tell (episodes are empty for season packs)
+#   codec: "x265", "x264", "AV1", "XviD" or None
+#   group: release group (the part after the last dash, like "NTb"), None if there is none
+ReleaseInfo = namedtuple('ReleaseInfo', ['quality', 'quality_spec', 'languages', 'seasons', 'episodes', 'codec',
+                                         'group'])
@@ -2,8 +2,9 @@ from models.media import Media
 
 
 class Series(Media):
-    def __init__(self, id, titles, season, episode, languages):
+    def __init__(self, id, titles, season, episode, languages, year=None):
         super().__init__(id, titles, languages, "series")
         self.season = season
         self.episode = episode
+        self.year = year  # Year of the last season, None if the series is still airing (or if it's unknown)
         self.seasonfile = None
@@ -0,0 +1,8 @@
+from collections import namedtuple
+
+# A file inside of a torrent.
+#   index: position of the file in the torrent, starting at 1 (the file id debrid services use too)
+#   path: path of the file inside of the torrent, folders separated by "/"
+#   name: name of the file, last part of the path
+#   size: size of the file in bytes
+TorrentFile = namedtuple('TorrentFile', ['index', 'path', 'name', 'size'])
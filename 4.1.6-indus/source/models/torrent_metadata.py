@@ -0,0 +1,10 @@
+from collections import namedtuple
+
+# What we read from a .torrent file, everything else in it (pieces, creation date, ...) is skipped without decoding.
+#   info_hash: lowercase hex SHA-1 of the info dictionary, as it is in the file
+#   name: name of the torrent (the file name for single file torrents, the folder otherwise)
+#   length: size of the file for single file torrents, None otherwise
+#   files: list of {"path": [...], "length": ...} for multi file torrents, None otherwise
+#   announce, announce_list: trackers, as they are in the file (None if missing)
+TorrentMetadata = namedtuple('TorrentMetadata', ['info_hash', 'name', 'length', 'files', 'announce',
+                                                 'announce_list'])
@@ -0,0 +1,179 @@
+import hashlib
+
+from models.torrent_metadata import TorrentMetadata
+
+_DICT = ord('d')
+_LIST = ord('l')
+_INT = ord('i')
+_END = ord('e')
+
+
+class BencodeScanError(ValueError):
+    pass
+
+
+def scan_torrent(torrent_file):
+    """Reads what we need from a .torrent file, in a TorrentMetadata.
+
+    The info hash is the SHA-1 of the info dictionary bytes, hashed in place through a memoryview: no decoding and
+    re-encoding of the whole dictionary (the pieces of a season pack are megabytes). Only the name, length, files and
+    announce fields are decoded, like bencode.bdecode would (strings are utf-8 text, bytes if they are not valid utf-8).
+    """
+    fields = dict()
+    info_hash = None
+
+    try:
+        position = _expect(torrent_file, 0, _DICT)
+        while torrent_file[position] != _END:
+            key, position = _read_string(torrent_file, position)
+
+            if key == b"info":
+                start = position
+                position = _scan_info(torrent_file, position, fields)
+                info_hash = _hash(torrent_file, start, position)
+            elif key == b"announce" or key == b"announce-list":
+                fields[key], position = _decode(torrent_file, position)
+            else:
+                position = _skip(torrent_file, position)
+    except (IndexError, ValueError) as e:
+        raise BencodeScanError(f"Invalid torrent file: {e}")
+
+    if info_hash is None or b"name" not in fields:
+        raise BencodeScanError("Invalid torrent file: no info dictionary or no name")
+
+    return TorrentMetadata(info_hash, fields[b"name"], fields.get(b"length"), fields.get(b"files"),
+                           fields.get(b"announce"), fields.get(b"announce-list"))
+
+
+def get_info_hash(torrent_file):
+    """Returns the info hash of a .torrent file, without decoding anything."""
+    try:
+        position = _expect(torrent_file, 0, _DICT)
+        while torrent_file[position] != _END:
+            key, position = _read_string(torrent_file, position)
+            end = _skip(torrent_file, position)
+            if key == b"info":
+                return _hash(torrent_file, position, end)
+            position = end
+    except (IndexError, ValueError) as e:
+        raise BencodeScanError(f"Invalid torrent file: {e}")
+
+    raise BencodeScanError("Invalid torrent file: no info dictionary")
+
+
+def _hash(data, start, end):
+    with memoryview(data) as view:
+        return hashlib.sha1(view[start:end]).hexdigest()
+
+
+def _scan_info(data, position, fields):
+    position = _expect(data, position, _DICT)
+    while data[position] != _END:
+        key, position = _read_string(data, position)
+
+        if key == b"name" or key == b"length":
+            fields[key], position = _decode(data, position)
+        elif key == b"files":
+            fields[key], position = _scan_files(data, position)
+        else:
+            position = _skip(data, position)
+
+    return position + 1
+
+
+def _scan_files(data, position):
+    files = []
+    position = _expect(data, position, _LIST)
+    while data[position] != _END:
+        file = dict()
+        position = _expect(data, position, _DICT)
+        while data[position] != _END:
+            key, position = _read_string(data, position)
+
+            if key == b"path" or key == b"length":
+                file[key.decode()], position = _decode(data, position)
+            else:
+                position = _skip(data, position)
+
+        files.append(file)
+        position += 1
+
+    return files, position + 1
+
+
+def _decode(data, position):
+    token = data[position]
+
+    if token == _INT:
+        end = data.index(b'e', position)
+        return int(data[position + 1:end]), end + 1
+
+    if token == _LIST:
+        values = []
+        position += 1
+        while data[position] != _END:
+            value, position = _decode(data, position)
+            values.append(value)
+        return values, position + 1
+
+    if token == _DICT:
+        values = dict()
+        position += 1
+        while data[position] != _END:
+            key, position = _read_string(data, position)
+            values[_to_text(key)], position = _decode(data, position)
+        return values, position + 1
+
+    value, position = _read_string(data, position)
+    return _to_text(value), position
+
+
+def _skip(data, position):
+    # Iterative, whatever the nesting: dictionaries and lists only change the depth, strings are jumped over
+    depth = 0
+    while True:
+        token = data[position]
+
+        if token == _DICT or token == _LIST:
+            depth += 1
+            position += 1
+        elif token == _END:
+            if depth == 0:
+                raise BencodeScanError(f"Unexpected end at {position}")
+            depth -= 1
+            position += 1
+        elif token == _INT:
+            position = data.index(b'e', position) + 1
+        else:
+            colon = data.index(b':', position)
+            length = int(data[position:colon])
+            position = colon + 1 + length
+            if length < 0 or position > len(data):
+                raise BencodeScanError("Truncated string")
+
+        if depth == 0:
+            return position
+
+
+def _read_string(data, position):
+    colon = data.index(b':', position)
+    start = colon + 1
+    end = start + int(data[position:colon])
+    if end < start or end > len(data):
+        raise BencodeScanError("Truncated string")
+
+    return data[start:end], end
+
+
+def _expect(data, position, token):
+    if data[position] != token:
+        raise BencodeScanError(f"Expected {chr(token)} at {position}")
+
+    return position + 1
+
+
+def _to_text(value):
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value
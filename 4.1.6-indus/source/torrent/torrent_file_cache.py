@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from torrent.bencode_scanner import get_info_hash, BencodeScanError
+from utils.logger import setup_logger
+
+
+class TorrentFileCache:
+    """On-disk cache of what Jackett download links resolve to, shared by the search and the playback.
+
+    Torrent files are content addressed: stored once under their info hash (torrents/<info hash>.torrent), whatever
+    the amount of links (indexers, searches) pointing to them. Each download link gets a small entry
+    (links/<sha256 of the link>.json) telling either the info hash of its torrent or the magnet it redirects to. Links
+    are hashed so the Jackett API key they contain is never written to disk.
+
+    The total size is capped, the least recently used files are evicted first. Any disk error is logged and treated
+    as a cache miss, the cache never breaks a search.
+    """
+
+    def __init__(self, directory, max_size):
+        self.logger = setup_logger(__name__)
+
+        self.__torrents_directory = os.path.join(directory, "torrents")
+        self.__links_directory = os.path.join(directory, "links")
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        self.__files = OrderedDict()  # path -> size, least recently used first
+        self.__size = 0
+
+        self.__load()
+
+    def get(self, link):
+        """Returns (torrent file, None) or (None, magnet) if the link is known, None otherwise."""
+        link_path = self.__get_link_path(link)
+        entry = self.__read(link_path)
+        if entry is None:
+            return None
+
+        try:
+            entry = json.loads(entry)
+        except ValueError:
+            self.__remove(link_path)
+            return None
+
+        if entry.get("magnet") is not None:
+            return None, entry["magnet"]
+
+        torrent_file = self.get_torrent(entry.get("info_hash"))
+        if torrent_file is None:
+            # The torrent file was evicted before the link
+            self.__remove(link_path)
+            return None
+
+        return torrent_file, None
+
+    def get_info_hash(self, link):
+        """Returns the info hash of the torrent file a link downloads, if it's known, without reading the torrent."""
+        entry = self.__read(self.__get_link_path(link))
+        if entry is None:
+            return None
+
+        try:
+            return json.loads(entry).get("info_hash")
+        except ValueError:
+            return None
+
+    def get_torrent(self, info_hash):
+        if info_hash is None:
+            return None
+
+        return self.__read(self.__get_torrent_path(info_hash))
+
+    def put_torrent(self, link, torrent_file, info_hash=None):
+        """Stores the torrent file a link downloads. Returns its info hash, None if it's not a valid torrent."""
+        if info_hash is None:
+            try:
+                info_hash = get_info_hash(torrent_file)
+            except BencodeScanError:
+                self.logger.debug("Not caching an invalid torrent file")
+                return None
+
+        info_hash = info_hash.lower()
+        self.__write(self.__get_torrent_path(info_hash), torrent_file)
+        if link is not None:
+            self.__write(self.__get_link_path(link), json.dumps({"info_hash": info_hash}).encode())
+
+        return info_hash
+
+    def put_magnet(self, link, magnet):
+        """Stores the magnet a link redirects to."""
+        self.__write(self.__get_link_path(link), json.dumps({"magnet": magnet}).encode())
+
+    def __get_torrent_path(self, info_hash):
+        return os.path.join(self.__torrents_directory, info_hash.lower() + ".torrent")
+
+    def __get_link_path(self, link):
+        return os.path.join(self.__links_directory, hashlib.sha256(link.encode()).hexdigest() + ".json")
+
+    def __load(self):
+        # Rebuild the LRU order from the access times left by the previous runs
+        files = []
+        for directory in (self.__torrents_directory, self.__links_directory):
+            try:
+                os.makedirs(directory, exist_ok=True)
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".tmp"):
+                            os.remove(entry.path)  # Left by an interrupted write
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files.append((stat.st_mtime, entry.path, stat.st_size))
+            except OSError:
+                self.logger.exception(f"Couldn't load the torrent file cache from {directory}")
+
+        for _, path, size in sorted(files):
+            self.__files[path] = size
+            self.__size += size
+
+        self.logger.info(f"Torrent file cache loaded: {len(self.__files)} files, {self.__size} bytes")
+        self.__evict()
+
+    def __read(self, path):
+        with self.__lock:
+            if path not in self.__files:
+                return None
+            self.__files.move_to_end(path)
+
+        try:
+            with open(path, "rb") as file:
+                content = file.read()
+            os.utime(path)  # Keeps the LRU order across restarts
+            return content
+        except OSError:
+            self.__remove(path)
+            return None
+
+    def __write(self, path, content):
+        try:
+            # Written aside then renamed, a reader never sees a partial file
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(content)
+            os.replace(temporary_path, path)
+        except OSError:
+            self.logger.exception(f"Couldn't write {path} to the torrent file cache")
+            return
+
+        with self.__lock:
+            self.__size += len(content) - self.__files.pop(path, 0)
+            self.__files[path] = len(content)
+
+        self.__evict()
+
+    def __remove(self, path):
+        with self.__lock:
+            self.__size -= self.__files.pop(path, 0)
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def __evict(self):
+        while True:
+            with self.__lock:
+                if self.__size <= self.__max_size or len(self.__files) == 0:
+                    return
+                path, size = self.__files.popitem(last=False)
+                self.__size -= size
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+torrent_file_cache = TorrentFileCache(
+    os.getenv("TORRENT_FILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "stremio-jackett", "torrent-files")),
+    int(os.getenv("TORRENT_FILE_CACHE_MAX_SIZE_MB", 512)) * 1024 * 1024
+)
@@ -0,0 +1,162 @@
+import os
+import threading
+from collections import OrderedDict
+
+from models.torrent_file import TorrentFile
+from torrent.bencode_scanner import scan_torrent, BencodeScanError
+from torrent.torrent_file_cache import torrent_file_cache
+from utils.season_episode import parse_files, match_parsed_files, parse_season_episode
+from utils.logger import setup_logger
+
+
+class TorrentFileList:
+    """The files of a torrent, with the file of each episode looked up once.
+
+    name and trackers are only known when the list comes from the torrent file itself (None when it comes from a
+    debrid service). files is None for single file torrents.
+    """
+
+    def __init__(self, info_hash, name, trackers, files):
+        self.info_hash = info_hash
+        self.name = name
+        self.trackers = trackers
+        self.files = files
+        self.__parsed_files = None  # Seasons and episodes of every file, parsed on the first lookup
+        self.__context_seasons = None  # Seasons of the torrent name, for files only telling the episode
+        self.__episode_files = dict()  # (season, episode) -> TorrentFile, None if the episode is not in the torrent
+
+    def find_episode_file(self, season, episode):
+        """Returns the largest video file of the episode (files named like S01E02 over files named like 1x02 or E02),
+        None if the torrent doesn't have it."""
+        key = (season, episode)
+        if key not in self.__episode_files:
+            self.__episode_files[key] = self.__find_episode_file(season, episode)
+
+        return self.__episode_files[key]
+
+    def find_largest_file(self):
+        if not self.files:
+            return None
+
+        return max(self.files, key=lambda file: file.size)
+
+    def __find_episode_file(self, season, episode):
+        if self.files is None:
+            return None
+
+        if self.__parsed_files is None:
+            self.__parsed_files = parse_files([file.path for file in self.files])
+            self.__context_seasons = parse_season_episode(self.name).seasons if isinstance(self.name, str) \
+                else frozenset()
+
+        episode_files = [self.files[position] for position in
+                         match_parsed_files(self.__parsed_files, season, episode, self.__context_seasons)]
+        if len(episode_files) == 0:
+            return None
+
+        return max(episode_files, key=lambda file: file.size)
+
+
+class TorrentFileIndex:
+    """File lists of the torrents seen lately, by info hash, shared by every search and playback.
+
+    A season pack is read once: the next episodes find their file in the index instead of downloading (or reading from
+    the torrent file cache) and scanning the torrent again. Lists come from torrent files, or from the file list of a
+    debrid service (same file ids). The least recently used lists are dropped past max_size, a list that was dropped
+    is rebuilt from the torrent file cache if the torrent is still there.
+    """
+
+    def __init__(self, max_size):
+        self.logger = setup_logger(__name__)
+
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        self.__file_lists = OrderedDict()  # info hash -> TorrentFileList, least recently used first
+
+    def get(self, info_hash, load=True):
+        """Returns the TorrentFileList of a torrent, None if it isn't known. Without load, only the lists in memory are
+        looked up: a list that was dropped isn't rebuilt from the torrent file cache (disk read and scan)."""
+        if info_hash is None:
+            return None
+
+        info_hash = info_hash.lower()
+        with self.__lock:
+            file_list = self.__file_lists.get(info_hash)
+            if file_list is not None:
+                self.__file_lists.move_to_end(info_hash)
+                return file_list
+
+        if not load:
+            return None
+
+        torrent_file = torrent_file_cache.get_torrent(info_hash)
+        if torrent_file is None:
+            return None
+
+        try:
+            return self.put_torrent(scan_torrent(torrent_file))
+        except BencodeScanError:
+            self.logger.debug(f"Invalid torrent file in cache for {info_hash}")
+            return None
+
+    def put_torrent(self, metadata):
+        """Indexes the files of a scanned torrent file (TorrentMetadata). Returns its TorrentFileList."""
+        files = None
+        if metadata.files is not None:
+            files = []
+            for index, file in enumerate(metadata.files, start=1):
+                parts = [_to_text(part) for part in file.get("path", [])]
+                files.append(TorrentFile(index, "/".join(parts), parts[-1] if parts else "", file.get("length", 0)))
+
+        return self.__put(TorrentFileList(metadata.info_hash, metadata.name, get_trackers_from_torrent(metadata),
+                                          files))
+
+    def put_files(self, info_hash, files):
+        """Indexes a list of TorrentFile from a debrid service, unless the torrent file is already indexed."""
+        with self.__lock:
+            file_list = self.__file_lists.get(info_hash.lower())
+            if file_list is not None:
+                return file_list
+
+        return self.__put(TorrentFileList(info_hash.lower(), None, None, files))
+
+    def __put(self, file_list):
+        with self.__lock:
+            self.__file_lists[file_list.info_hash] = file_list
+            self.__file_lists.move_to_end(file_list.info_hash)
+
+            while len(self.__file_lists) > self.__max_size:
+                self.__file_lists.popitem(last=False)
+
+        return file_list
+
+
+def get_trackers_from_torrent(metadata):
+    # Sometimes list, sometimes string
+    announce = metadata.announce if metadata.announce is not None else []
+    # Sometimes 2D array, sometimes 1D array
+    announce_list = metadata.announce_list if metadata.announce_list is not None else []
+
+    trackers = set()
+    if isinstance(announce, str):
+        trackers.add(announce)
+    elif isinstance(announce, list):
+        for tracker in announce:
+            trackers.add(tracker)
+
+    for announce_list_item in announce_list:
+        if isinstance(announce_list_item, list):
+            for tracker in announce_list_item:
+                trackers.add(tracker)
+        if isinstance(announce_list_item, str):
+            trackers.add(announce_list_item)
+
+    return list(trackers)
+
+
+def _to_text(value):
+    # Names that are not valid utf-8 are kept as bytes by the scanner
+    return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value)
+
+
+torrent_file_index = TorrentFileIndex(int(os.getenv("TORRENT_FILE_INDEX_SIZE", 5000)))
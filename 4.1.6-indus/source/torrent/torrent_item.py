@@ -1,23 +1,20 @@
 from urllib.parse import quote
 
-from utils.logger import setup_logger
-
 
 class TorrentItem:
-    def __init__(self, title, size, magnet, info_hash, link, seeders, languages, quality, quality_spec, indexer,
-                 privacy,
-                 episode=None, season=None, type=None):
-        self.logger = setup_logger(__name__)
+    __slots__ = ('title', 'size', 'magnet', 'info_hash', 'link', 'seeders', 'release_info', 'indexer', 'episode',
+                 'season', 'type', 'privacy', 'file_name', 'files', 'torrent_download', 'trackers', 'file_index',
+                 'availability')
 
+    def __init__(self, title, size, magnet, info_hash, link, seeders, release_info, indexer, privacy,
+                 episode=None, season=None, type=None):
         self.title = title  # Title of the torrent
-        self.size = size  # Size of the video file inside of the torrent - it may be updated durring __process_torrent()
+        self.size = size  # Size in bytes (int) of the video file inside of the torrent - it may be updated durring __process_torrent()
         self.magnet = magnet  # Magnet to torrent
         self.info_hash = info_hash  # Hash of the torrent
         self.link = link  # Link to download torrent file or magnet link
-        self.seeders = seeders  # The number of seeders
-        self.languages = languages  # Language of the torrent
-        self.quality = quality  # Quality of the torrent
-        self.quality_spec = quality_spec if quality_spec is not None else []  # Quality specifications of the torrent
+        self.seeders = seeders  # The number of seeders (int)
+        self.release_info = release_info  # ReleaseInfo parsed from the title (quality, languages...)
         self.indexer = indexer  # Indexer of the torrent
         self.episode = episode  # Episode if its a series (for example: "E01" or "E14")
         self.season = season  # Season if its a series (for example: "S01" or "S14")
@@ -32,6 +29,16 @@ class TorrentItem:
 
         self.availability = False  # If its instantly available on the debrid service
 
+    def is_playable(self):
+        if self.info_hash is None:
+            return False
+
+        if self.torrent_download is not None:  # Torrent download
+            # If the season/episode is present inside the torrent filestructure (movies always have a file_index)
+            return self.file_index is not None
+
+        return True  # Magnet, the file is chosen by the debrid service or the player
+
     def to_debrid_stream_query(self) -> dict:
         return {
             "magnet": self.magnet,
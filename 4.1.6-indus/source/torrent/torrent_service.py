@@ -1,17 +1,18 @@
-import hashlib
-import queue
-import threading
+import asyncio
 import urllib.parse
 from typing import List
 
-import bencode
 import requests
 
 from jackett.jackett_result import JackettResult
+from torrent.bencode_scanner import scan_torrent
+from torrent.torrent_file_cache import torrent_file_cache
+from torrent.torrent_file_index import torrent_file_index, TorrentFileList
 from torrent.torrent_item import TorrentItem
 from utils.general import get_info_hash_from_magnet
-from utils.general import season_episode_in_filename
+from utils.executors import get_executor, NETWORK
 from utils.logger import setup_logger
+from utils.ranking import get_stream_rank, NO_STREAM
 
 
 class TorrentService:
@@ -19,37 +20,99 @@ class TorrentService:
         self.logger = setup_logger(__name__)
         self.__session = requests.Session()
 
-    def convert_and_process(self, results: List[JackettResult]):
-        threads = []
-        torrent_items_queue = queue.Queue()
+    def process(self, result: JackettResult, download=True):
+        """Converts a result to a TorrentItem and resolves its torrent (blocking, runs in the network pool).
 
-        def thread_target(result: JackettResult):
-            torrent_item = result.convert_to_torrent_item()
+        Without download, a result whose info hash or magnet is already known isn't downloaded: it's used as a magnet.
+        A torrent that can't be resolved (like an indexer answering with a login page) gives its unresolved item.
+        """
+        torrent_item = result.convert_to_torrent_item()
 
+        try:
             if torrent_item.link.startswith("magnet:"):
-                processed_torrent_item = self.__process_magnet(torrent_item)
+                return self.__process_magnet(torrent_item)
+
+            if not download and not self.needs_download(result):
+                if torrent_item.magnet is None:
+                    torrent_item.magnet = self.__build_magnet(torrent_item.info_hash, torrent_item.title, [])
+                return self.__process_magnet(torrent_item)
+
+            return self.__process_web_url(torrent_item)
+        except Exception as e:
+            self.logger.error(f"Error while processing torrent: {result.link}", exc_info=e)
+            return torrent_item
+
+    def needs_download(self, result: JackettResult):
+        return not result.link.startswith("magnet:") and result.info_hash is None and result.magnet is None
+
+    async def process_candidates(self, candidates: List[JackettResult], config):
+        """Converts ranked results to TorrentItems, downloading torrent files only for the best ones.
+
+        Results that need no download are all kept. Torrent files are downloaded in rank order, as many at once as
+        playable items are still missing, until config['maxResults'] of the items ranked so far are playable. The
+        remaining downloads are skipped.
+
+        Debrid availability is only checked afterwards, so only items giving a stream without it (public torrents, when
+        torrenting is enabled) count as playable. With debrid alone, every torrent is downloaded.
+        """
+        amount = int(config['maxResults'])
+        network_executor = get_executor(NETWORK)
+        torrent_items = []
+        playable = 0
+        position = 0
+
+        while position < len(candidates) and playable < amount:
+            downloads = []
+            while position < len(candidates) and len(downloads) < amount - playable:
+                result = candidates[position]
+                position += 1
+
+                if self.needs_download(result):
+                    downloads.append(network_executor.run(self.process, result))
+                else:
+                    torrent_item = self.process(result, download=False)
+                    torrent_items.append(torrent_item)
+                    playable += self.__is_stream(torrent_item, config)
+
+            # A failed download only loses its own result, it counts as not playable
+            for torrent_item in await asyncio.gather(*downloads, return_exceptions=True):
+                if isinstance(torrent_item, BaseException):
+                    self.logger.error("Error while downloading a torrent", exc_info=torrent_item)
+                    continue
+
+                torrent_items.append(torrent_item)
+                playable += self.__is_stream(torrent_item, config)
+
+        skipped_downloads = 0
+        for result in candidates[position:]:
+            if self.needs_download(result):
+                skipped_downloads += 1
             else:
-                processed_torrent_item = self.__process_web_url(torrent_item)
-
-            torrent_items_queue.put(processed_torrent_item)
-
-        for result in results:
-            threads.append(threading.Thread(target=thread_target, args=(result,)))
-
-        for thread in threads:
-            thread.start()
+                torrent_items.append(self.process(result, download=False))
 
-        for thread in threads:
-            thread.join()
+        self.logger.info(f"Resolved {len(torrent_items)} results ({playable} playable among the best ones), "
+                         f"skipped {skipped_downloads} torrent downloads")
+        return torrent_items
 
-        torrent_items_result = []
-
-        while not torrent_items_queue.empty():
-            torrent_items_result.append(torrent_items_queue.get())
-
-        return torrent_items_result
+    def __is_stream(self, torrent_item: TorrentItem, config):
+        return torrent_item.is_playable() and get_stream_rank(torrent_item, config) != NO_STREAM
 
     def __process_web_url(self, result: TorrentItem):
+        # Torrents already read (season packs, for the next episodes) don't have to be read again
+        info_hash = result.info_hash if result.info_hash is not None else torrent_file_cache.get_info_hash(result.link)
+        file_list = torrent_file_index.get(info_hash)
+        if file_list is not None and file_list.name is not None:
+            return self.__process_file_list(result, file_list)
+
+        cached = torrent_file_cache.get(result.link)
+        if cached is not None:
+            torrent_file, magnet = cached
+            if torrent_file is not None:
+                return self.__process_torrent(result, torrent_file)
+
+            result.magnet = magnet
+            return self.__process_magnet(result)
+
         try:
             response = self.__session.get(result.link, allow_redirects=False, timeout=10)
         except requests.exceptions.RequestException:
@@ -60,9 +123,12 @@ class TorrentService:
             return result
 
         if response.status_code == 200:
-            return self.__process_torrent(result, response.content)
+            result = self.__process_torrent(result, response.content)
+            torrent_file_cache.put_torrent(result.link, response.content, result.info_hash)
+            return result
         elif response.status_code == 302:
             result.magnet = response.headers['Location']
+            torrent_file_cache.put_magnet(result.link, result.magnet)
             return self.__process_magnet(result)
         else:
             self.logger.error(f"Error code {response.status_code} while processing url: {result.link}")
@@ -70,28 +136,30 @@ class TorrentService:
         return result
 
     def __process_torrent(self, result: TorrentItem, torrent_file):
-        metadata = bencode.bdecode(torrent_file)
+        return self.__process_file_list(result, torrent_file_index.put_torrent(scan_torrent(torrent_file)))
 
+    def __process_file_list(self, result: TorrentItem, file_list: TorrentFileList):
         result.torrent_download = result.link
-        result.trackers = self.__get_trackers_from_torrent(metadata)
-        result.info_hash = self.__convert_torrent_to_hash(metadata["info"])
-        result.magnet = self.__build_magnet(result.info_hash, metadata["info"]["name"], result.trackers)
+        result.trackers = list(file_list.trackers)
+        result.info_hash = file_list.info_hash
+        result.magnet = self.__build_magnet(result.info_hash, file_list.name, result.trackers)
 
-        if "files" not in metadata["info"]:
+        if file_list.files is None:
             result.file_index = 1
             return result
 
-        result.files = metadata["info"]["files"]
+        result.files = file_list.files
 
         if result.type == "series":
-            file_details = self.__find_episode_file(result.files, result.season, result.episode)
+            file = file_list.find_episode_file(result.season, result.episode)
 
-            if file_details is not None:
-                result.file_index = file_details["file_index"]
-                result.file_name = file_details["title"]
-                result.size = file_details["size"]
+            if file is not None:
+                result.file_index = file.index
+                result.file_name = file.name
+                result.size = file.size
         else:
-            result.file_index = self.__find_movie_file(result.files)
+            largest_file = file_list.find_largest_file()
+            result.file_index = largest_file.index if largest_file is not None else 1
 
         return result
 
@@ -106,11 +174,6 @@ class TorrentService:
 
         return result
 
-    def __convert_torrent_to_hash(self, torrent_contents):
-        hashcontents = bencode.bencode(torrent_contents)
-        hexHash = hashlib.sha1(hashcontents).hexdigest()
-        return hexHash.lower()
-
     def __build_magnet(self, hash, display_name, trackers):
         magnet_base = "magnet:?xt=urn:btih:"
         magnet = f"{magnet_base}{hash}&dn={display_name}"
@@ -120,28 +183,6 @@ class TorrentService:
 
         return magnet
 
-    def __get_trackers_from_torrent(self, torrent_metadata):
-        # Sometimes list, sometimes string
-        announce = torrent_metadata["announce"] if "announce" in torrent_metadata else []
-        # Sometimes 2D array, sometimes 1D array
-        announce_list = torrent_metadata["announce-list"] if "announce-list" in torrent_metadata else []
-
-        trackers = set()
-        if isinstance(announce, str):
-            trackers.add(announce)
-        elif isinstance(announce, list):
-            for tracker in announce:
-                trackers.add(tracker)
-
-        for announce_list_item in announce_list:
-            if isinstance(announce_list_item, list):
-                for tracker in announce_list_item:
-                    trackers.add(tracker)
-            if isinstance(announce_list_item, str):
-                trackers.add(announce_list_item)
-
-        return list(trackers)
-
     def __get_trackers_from_magnet(self, magnet: str):
         url_parts = urllib.parse.urlparse(magnet)
         query_parts = urllib.parse.parse_qs(url_parts.query)
@@ -151,44 +192,3 @@ class TorrentService:
             trackers = query_parts["tr"]
 
         return trackers
-
-    def __find_episode_file(self, file_structure, season, episode):
-        file_index = 1
-        strict_episode_files = []
-        episode_files = []
-        for files in file_structure:
-            for file in files["path"]:
-                if season_episode_in_filename(file, season, episode, strict=True):
-                    strict_episode_files.append({
-                        "file_index": file_index,
-                        "title": file,
-                        "size": files["length"]
-                    })
-                elif season_episode_in_filename(file, season, episode, strict=False):
-                    episode_files.append({
-                        "file_index": file_index,
-                        "title": file,
-                        "size": files["length"]
-                    })
-
-            file_index += 1
-
-        if len(strict_episode_files) > 0:
-            episode_files = strict_episode_files
-
-        if len(episode_files) == 0:
-            return None
-
-        return max(episode_files, key=lambda file: file["size"])
-
-    def __find_movie_file(self, file_structure):
-        max_size = 0
-        max_file_index = 1
-        current_file_index = 1
-        for files in file_structure:
-            if files["length"] > max_size:
-                max_file_index = current_file_index
-                max_size = files["length"]
-            current_file_index += 1
-
-        return max_file_index
@@ -4,9 +4,10 @@ from typing import List, Dict
 from debrid.alldebrid import AllDebrid
 from debrid.premiumize import Premiumize
 from debrid.realdebrid import RealDebrid
+from torrent.torrent_file_index import torrent_file_index
 from torrent.torrent_item import TorrentItem
 from utils.cache import cache_results
-from utils.general import season_episode_in_filename
+from utils.season_episode import match_episode_files
 from utils.logger import setup_logger
 
 
@@ -35,14 +36,9 @@ class TorrentSmartContainer:
             self.logger.debug(f"-------------------")
             self.logger.debug(f"Checking {torrent_item.title}")
             self.logger.debug(f"Has torrent: {torrent_item.torrent_download is not None}")
-            if torrent_item.torrent_download is not None:  # Torrent download
-                self.logger.debug(f"Has file index: {torrent_item.file_index is not None}")
-                if torrent_item.file_index is not None:
-                    # If the season/episode is present inside the torrent filestructure (movies always have a
-                    # file_index)
-                    best_matching.append(torrent_item)
-            else:  # Magnet
-                best_matching.append(torrent_item)  # If it's a movie with a magnet link
+            self.logger.debug(f"Has file index: {torrent_item.file_index is not None}")
+            if torrent_item.is_playable():
+                best_matching.append(torrent_item)
 
         return best_matching
 
@@ -71,24 +67,9 @@ class TorrentSmartContainer:
             torrent_item: TorrentItem = self.__itemsDict[info_hash]
 
             files = []
-            strict_files = []
-            if torrent_item.type == "series":
-                for variants in details["rd"]:
-                    for file_index, file in variants.items():
-                        if season_episode_in_filename(file["filename"], torrent_item.season, torrent_item.episode,
-                                                      strict=True):
-                            strict_files.append({
-                                "file_index": file_index,
-                                "title": file["filename"],
-                                "size": file["filesize"]
-                            })
-                        elif season_episode_in_filename(file["filename"], torrent_item.season, torrent_item.episode,
-                                                        strict=False):
-                            files.append({
-                                "file_index": file_index,
-                                "title": file["filename"],
-                                "size": file["filesize"]
-                            })
+            cached_episode_file = self.__find_cached_episode_file(torrent_item, details["rd"])
+            if cached_episode_file is not None:
+                files.append(cached_episode_file)
             else:
                 for variants in details["rd"]:
                     for file_index, file in variants.items():
@@ -98,8 +79,8 @@ class TorrentSmartContainer:
                             "size": file["filesize"]
                         })
 
-            if len(strict_files) > 0:
-                files = strict_files
+                if torrent_item.type == "series":
+                    files = self.__filter_episode_files(torrent_item, files)
 
             self.__update_file_details(torrent_item, files)
 
@@ -115,12 +96,19 @@ class TorrentSmartContainer:
             torrent_item: TorrentItem = self.__itemsDict[data["hash"]]
 
             files = []
-            strict_files = []
-            self.__explore_folders(data["files"], files, strict_files, 1, torrent_item.type, torrent_item.season,
-                                   torrent_item.episode)
+            episode_file = self.__find_indexed_episode_file(torrent_item)
+            if episode_file is not None:
+                # Every file of the torrent is in the instant magnet, no need to explore it
+                files.append({
+                    "file_index": episode_file.index,
+                    "title": episode_file.name,
+                    "size": episode_file.size
+                })
+            else:
+                self.__explore_folders(data["files"], files)
 
-            if len(strict_files) > 0:
-                files = strict_files
+                if torrent_item.type == "series":
+                    files = self.__filter_episode_files(torrent_item, files)
 
             self.__update_file_details(torrent_item, files)
 
@@ -134,6 +122,40 @@ class TorrentSmartContainer:
             if bool(response["response"][i]):
                 torrent_items[i].availability = response["transcoded"][i] == True
 
+    def __find_indexed_episode_file(self, torrent_item):
+        if torrent_item.type != "series":
+            return None
+
+        # Runs on the event loop, for every item: only the lists already in memory are used
+        file_list = torrent_file_index.get(torrent_item.info_hash, load=False)
+        if file_list is None:
+            return None
+
+        return file_list.find_episode_file(torrent_item.season, torrent_item.episode)
+
+    def __find_cached_episode_file(self, torrent_item, variants):
+        # Real-Debrid file ids are the indexes of the files in the torrent, the episode file found in the index only
+        # has to be in one of the cached variants
+        episode_file = self.__find_indexed_episode_file(torrent_item)
+        if episode_file is None:
+            return None
+
+        for variant in variants:
+            file = variant.get(str(episode_file.index))
+            if file is not None:
+                return {
+                    "file_index": str(episode_file.index),
+                    "title": file["filename"],
+                    "size": file["filesize"]
+                }
+
+        return None
+
+    def __filter_episode_files(self, torrent_item, files):
+        file_names = [file["title"] for file in files]
+        return [files[position] for position in
+                match_episode_files(file_names, torrent_item.season, torrent_item.episode)]
+
     def __update_file_details(self, torrent_item, files):
         if len(files) == 0:
             return
@@ -156,39 +178,17 @@ class TorrentSmartContainer:
         return items_dict
 
     # Simple recursion to traverse the file structure returned by AllDebrid
-    def __explore_folders(self, folder, files, strict_files, file_index, type, season=None, episode=None):
-        if type == "series":
-            for file in folder:
-                if "e" in file:
-                    file_index = self.__explore_folders(file["e"], files, strict_files, file_index, type, season,
-                                                        episode)
-                    continue
-
-                if season_episode_in_filename(file["n"], season, episode, strict=True):
-                    strict_files.append({
-                        "file_index": file_index,
-                        "title": file["n"],
-                        "size": file["s"] if "s" in file else 0
-                    })
-                elif season_episode_in_filename(file["n"], season, episode, strict=False):
-                    files.append({
-                        "file_index": file_index,
-                        "title": file["n"],
-                        "size": file["s"] if "s" in file else 0
-                    })
-                file_index += 1
-        elif type == "movie":
-            file_index = 1
-            for file in folder:
-                if "e" in file:
-                    file_index = self.__explore_folders(file["e"], files, strict_files, file_index, type)
-                    continue
+    def __explore_folders(self, folder, files, file_index=1):
+        for file in folder:
+            if "e" in file:
+                file_index = self.__explore_folders(file["e"], files, file_index)
+                continue
 
-                files.append({
-                    "file_index": file_index,
-                    "title": file["n"],
-                    "size": file["s"] if "s" in file else 0
-                })
-                file_index += 1
+            files.append({
+                "file_index": file_index,
+                "title": file["n"],
+                "size": file["s"] if "s" in file else 0
+            })
+            file_index += 1
 
         return file_index
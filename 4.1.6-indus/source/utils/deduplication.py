@@ -0,0 +1,74 @@
+import re
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def get_title_key(result):
+    # Indexers rename releases a bit: dots, spaces, brackets and case are ignored, the size has to be exact
+    normalized_title = _SEPARATORS.sub(" ", result.title.lower()).strip()
+    return normalized_title, result.size
+
+
+def get_seeders(result):
+    return result.seeders if result.seeders is not None else 0
+
+
+class ResultDeduplicator:
+    """Groups the results of a search that are the same release, found on several indexers.
+
+    Results are grouped by the info hash given by the indexer, or, when there is none, by normalized title and size.
+    A release found with and without info hash is a single group whichever comes first, as long as title and size
+    match: a result without info hash joins the group of one with it, a result with a new info hash joins the group of
+    one without. The first result of a group is the only one whose torrent gets resolved, the best seeded one gives the
+    seeders and indexer.
+    """
+
+    def __init__(self):
+        self.__groups = dict()  # info hash or title key -> [first result, best seeded result, info hash of the group]
+        self.__groups_by_result = dict()  # id of the first result -> its group
+        self.duplicates = 0
+
+    def add(self, results):
+        """Returns the results that are not a duplicate of a result added before."""
+        new_results = []
+        for result in results:
+            info_hash = result.info_hash.lower() if result.info_hash else None
+            title_key = get_title_key(result)
+
+            group = self.__groups.get(info_hash) if info_hash is not None else self.__groups.get(title_key)
+            if group is None and info_hash is not None:
+                # Same title and size as a result without info hash (a result with another info hash is another torrent)
+                title_group = self.__groups.get(title_key)
+                if title_group is not None and title_group[2] is None:
+                    title_group[2] = info_hash
+                    group = self.__groups[info_hash] = title_group
+            if group is not None:
+                self.duplicates += 1
+                if get_seeders(result) > get_seeders(group[1]):
+                    group[1] = result
+                continue
+
+            group = [result, result, info_hash]
+            if info_hash is not None:
+                self.__groups[info_hash] = group
+            self.__groups.setdefault(title_key, group)
+            self.__groups_by_result[id(result)] = group
+            new_results.append(result)
+
+        return new_results
+
+    def get_best(self, result):
+        """Returns the best seeded result of the group of a result returned by add()."""
+        return self.__groups_by_result[id(result)][1]
+
+    def apply_best(self, item, result):
+        """Gives an item (a result returned by add(), or the torrent item resolved from it) the seeders and indexer of
+        the best copy of the release."""
+        best_result = self.get_best(result)
+        item.seeders = best_result.seeders
+        item.indexer = best_result.indexer
+        return item
@@ -1,86 +1,229 @@
+import os
 import re
+from functools import lru_cache
 
+from models.release_info import ReleaseInfo
+from utils.season_episode import parse_season_episode
 
-def detect_quality(torrent_name):
-    quality_patterns = {
-        "4k": r'\b(2160P|UHD|4K)\b',
-        "1080p": r'\b(1080P|FHD|FULLHD|HD|HIGHDEFINITION)\b',
-        "720p": r'\b(720P|HD|HIGHDEFINITION)\b',
-        "480p": r'\b(480P|SD|STANDARDDEFINITION)\b'
-    }
+QUALITY_PATTERNS = {
+    "4k": r'\b(2160P|UHD|4K)\b',
+    "1080p": r'\b(1080P|FHD|FULLHD|HD|HIGHDEFINITION)\b',
+    "720p": r'\b(720P|HD|HIGHDEFINITION)\b',
+    "480p": r'\b(480P|SD|STANDARDDEFINITION)\b'
+}
 
-    for quality, pattern in quality_patterns.items():
-        if re.search(pattern, torrent_name, re.IGNORECASE):
-            return quality
-    return "Unknown"
+QUALITY_SPEC_PATTERNS = {
+    "HDR": r'\b(HDR|HDR10|HDR10PLUS|HDR10PLUS|HDR10PLUS)\b',
+    "DTS": r'\b(DTS|DTS-HD)\b',
+    "DDP": r'\b(DDP|DDP5.1|DDP7.1)\b',
+    "DD": r'\b(DD|DD5.1|DD7.1)\b',
+    "SDR": r'\b(SDR|SDRIP)\b',
+    "WEBDL": r'\b(WEBDL|WEB-DL|WEB)\b',
+    "BLURAY": r'\b(BLURAY|BLU-RAY|BD)\b',
+    "DVDRIP": r'\b(DVDRIP|DVDR)\b',
+    "CAM": r'\b(CAM|CAMRIP|CAM-RIP)\b',
+    "TS": r'\b(TS|TELESYNC|TELESYNC)\b',
+    "TC": r'\b(TC|TELECINE|TELECINE)\b',
+    "R5": r'\b(R5|R5LINE|R5-LINE)\b',
+    "DVDSCR": r'\b(DVDSCR|DVD-SCR)\b',
+    "HDTV": r'\b(HDTV|HDTVRIP|HDTV-RIP)\b',
+    "PDTV": r'\b(PDTV|PDTVRIP|PDTV-RIP)\b',
+    "DSR": r'\b(DSR|DSRRIP|DSR-RIP)\b',
+    "WORKPRINT": r'\b(WORKPRINT|WP)\b',
+    "VHSRIP": r'\b(VHSRIP|VHS-RIP)\b',
+    "VODRIP": r'\b(VODRIP|VOD-RIP)\b',
+    "TVRIP": r'\b(TVRIP|TV-RIP)\b',
+    "WEBRIP": r'\b(WEBRIP|WEB-RIP)\b',
+    "BRRIP": r'\b(BRRIP|BR-RIP)\b',
+    "BDRIP": r'\b(BDRIP|BD-RIP)\b',
+    "HDCAM": r'\b(HDCAM|HD-CAM)\b',
+    "HDRIP": r'\b(HDRIP|HD-RIP)\b',
+}
 
+LANGUAGE_PATTERNS = {
+    "fr": r'\b(FRENCH|FR|VF|VF2|VFF|TRUEFRENCH|VFQ|FRA)\b',
+    "en": r'\b(ENGLISH|EN|ENG)\b',
+    "es": r'\b(SPANISH|ES|ESP)\b',
+    "de": r'\b(GERMAN|DE|GER)\b',
+    "it": r'\b(ITALIAN|IT|ITA)\b',
+    "pt": r'\b(PORTUGUESE|PT|POR)\b',
+    "ru": r'\b(RUSSIAN|RU|RUS)\b',
+    "in": r'\b(INDIAN|IN|HINDI|TELUGU|TAMIL|KANNADA|MALAYALAM|PUNJABI|MARATHI|BENGALI|GUJARATI|URDU|ODIA|ASSAMESE|KONKANI|MANIPURI|NEPALI|SANSKRIT|SINHALA|SINDHI|TIBETAN|BHOJPURI|DHIVEHI|KASHMIRI|KURUKH|MAITHILI|NEWARI|RAJASTHANI|SANTALI|SINDHI|TULU)\b',
+    "nl": r'\b(DUTCH|NL|NLD)\b',
+    "hu": r'\b(HUNGARIAN|HU|HUN)\b',
+    "la": r'\b(LATIN|LATINO|LA)\b',
+    "multi": r"\b(MULTI)\b"
+}
 
-def detect_and_format_quality_spec(torrent_name):
-    qualities = detect_quality_spec(torrent_name)
-    return "/".join(qualities) if qualities else "Unknown"
+CODEC_PATTERNS = {
+    "x265": r'\b(X265|H265|HEVC|H\.265)\b',
+    "x264": r'\b(X264|H264|AVC|H\.264)\b',
+    "AV1": r'\b(AV1)\b',
+    "XviD": r'\b(XVID)\b'
+}
 
+QUALITY = 0
+QUALITY_SPEC = 1
+LANGUAGE = 2
+CODEC = 3
 
-def detect_quality_spec(torrent_name):
-    quality_patterns = {
-        "HDR": r'\b(HDR|HDR10|HDR10PLUS|HDR10PLUS|HDR10PLUS)\b',
-        "DTS": r'\b(DTS|DTS-HD)\b',
-        "DDP": r'\b(DDP|DDP5.1|DDP7.1)\b',
-        "DD": r'\b(DD|DD5.1|DD7.1)\b',
-        "SDR": r'\b(SDR|SDRIP)\b',
-        "WEBDL": r'\b(WEBDL|WEB-DL|WEB)\b',
-        "BLURAY": r'\b(BLURAY|BLU-RAY|BD)\b',
-        "DVDRIP": r'\b(DVDRIP|DVDR)\b',
-        "CAM": r'\b(CAM|CAMRIP|CAM-RIP)\b',
-        "TS": r'\b(TS|TELESYNC|TELESYNC)\b',
-        "TC": r'\b(TC|TELECINE|TELECINE)\b',
-        "R5": r'\b(R5|R5LINE|R5-LINE)\b',
-        "DVDSCR": r'\b(DVDSCR|DVD-SCR)\b',
-        "HDTV": r'\b(HDTV|HDTVRIP|HDTV-RIP)\b',
-        "PDTV": r'\b(PDTV|PDTVRIP|PDTV-RIP)\b',
-        "DSR": r'\b(DSR|DSRRIP|DSR-RIP)\b',
-        "WORKPRINT": r'\b(WORKPRINT|WP)\b',
-        "VHSRIP": r'\b(VHSRIP|VHS-RIP)\b',
-        "VODRIP": r'\b(VODRIP|VOD-RIP)\b',
-        "TVRIP": r'\b(TVRIP|TV-RIP)\b',
-        "WEBRIP": r'\b(WEBRIP|WEB-RIP)\b',
-        "BRRIP": r'\b(BRRIP|BR-RIP)\b',
-        "BDRIP": r'\b(BDRIP|BD-RIP)\b',
-        "HDCAM": r'\b(HDCAM|HD-CAM)\b',
-        "HDRIP": r'\b(HDRIP|HD-RIP)\b',
-    }
+_KINDS = (QUALITY_PATTERNS, QUALITY_SPEC_PATTERNS, LANGUAGE_PATTERNS, CODEC_PATTERNS)
+_ASCII_WORD = re.compile(r'[A-Z0-9_]+')
+_WORD = re.compile(r'\w+')
+_GROUP = re.compile(r'-([A-Za-z0-9]+)(?:\.(?:mkv|mp4|avi))?(?:\s*\[[^\]]*\])?$', re.IGNORECASE)
+_COMPILED_PATTERNS = tuple({label: re.compile(pattern, re.IGNORECASE) for label, pattern in patterns.items()}
+                           for patterns in _KINDS)
 
-    qualities = []
-    for quality, pattern in quality_patterns.items():
-        if re.search(pattern, torrent_name, re.IGNORECASE):
-            qualities.append(quality)
-    return qualities if qualities else None
 
+def _build_tables():
+    """Turns the patterns above into lookup tables.
 
-def detect_languages(torrent_name):
-    language_patterns = {
-        "fr": r'\b(FRENCH|FR|VF|VF2|VFF|TRUEFRENCH|VFQ|FRA)\b',
-        "en": r'\b(ENGLISH|EN|ENG)\b',
-        "es": r'\b(SPANISH|ES|ESP)\b',
-        "de": r'\b(GERMAN|DE|GER)\b',
-        "it": r'\b(ITALIAN|IT|ITA)\b',
-        "pt": r'\b(PORTUGUESE|PT|POR)\b',
-        "ru": r'\b(RUSSIAN|RU|RUS)\b',
-        "in": r'\b(INDIAN|IN|HINDI|TELUGU|TAMIL|KANNADA|MALAYALAM|PUNJABI|MARATHI|BENGALI|GUJARATI|URDU|ODIA|ASSAMESE|KONKANI|MANIPURI|NEPALI|SANSKRIT|SINHALA|SINDHI|TIBETAN|BHOJPURI|DHIVEHI|KASHMIRI|KURUKH|MAITHILI|NEWARI|RAJASTHANI|SANTALI|SINDHI|TULU)\b',
-        "nl": r'\b(DUTCH|NL|NLD)\b',
-        "hu": r'\b(HUNGARIAN|HU|HUN)\b',
-        "la": r'\b(LATIN|LATINO|LA)\b',
-        "multi": r"\b(MULTI)\b"
+    An alternative made of word characters only (like HDR) matches exactly when the title has that word, it goes in a
+    word -> labels table. Other alternatives (like BLU-RAY or DDP5.1) keep a regex, only tried when a word of the title
+    starts with their leading word characters (BLU, DDP5).
+    """
+    words = dict()  # word -> ((kind, label), ...)
+    prefixes = dict()  # leading word characters -> ((kind, label, regex), ...)
+
+    for kind, patterns in enumerate(_KINDS):
+        for label, pattern in patterns.items():
+            alternatives = re.fullmatch(r'\\b\((.*)\)\\b', pattern).group(1).split('|')
+            simple_alternatives = {alternative for alternative in alternatives if re.fullmatch(r'\w+', alternative)}
+
+            for alternative in simple_alternatives:
+                words[alternative] = words.get(alternative, ()) + ((kind, label),)
+
+            for alternative in alternatives:
+                if alternative in simple_alternatives:
+                    continue
+
+                # Every match of "BD-RIP" is also a match of the word "BD", no need to check it if BD is an alternative
+                prefix = re.match(r'\w+', alternative).group(0)
+                if prefix in simple_alternatives:
+                    continue
+
+                regex = re.compile(r'\b(' + alternative + r')\b', re.IGNORECASE)
+                prefixes[prefix] = prefixes.get(prefix, ()) + ((kind, label, regex),)
+
+    return words, prefixes
+
+
+_WORDS, _PREFIXES = _build_tables()
+_PREFIX_LENGTHS = sorted({len(prefix) for prefix in _PREFIXES})
+_ANY_WORD = re.compile('|'.join(_WORDS), re.IGNORECASE)
+
+
+def _find_labels(torrent_name):
+    """Returns the set of (kind, label) found in the name, with a single pass over its words."""
+    if not torrent_name.isascii():
+        return _find_labels_unicode(torrent_name)
+
+    found = set()
+
+    for word in _ASCII_WORD.findall(torrent_name.upper()):
+        labels = _WORDS.get(word)
+        if labels is not None:
+            found.update(labels)
+
+        for length in _PREFIX_LENGTHS:
+            if length > len(word):
+                break
+
+            candidates = _PREFIXES.get(word[:length])
+            if candidates is not None:
+                for kind, label, regex in candidates:
+                    if (kind, label) not in found and regex.search(torrent_name):
+                        found.add((kind, label))
+
+    return found
+
+
+def _find_labels_unicode(torrent_name):
+    # Case insensitive matching is unicode aware (the long s matches S for instance), words that are not plain ascii
+    # are left to the regex engine
+    found = set()
+
+    for word in _WORD.findall(torrent_name):
+        if word.isascii():
+            found.update(_WORDS.get(word.upper(), ()))
+        elif _ANY_WORD.fullmatch(word):
+            for kind, patterns in enumerate(_COMPILED_PATTERNS):
+                for label, pattern in patterns.items():
+                    if pattern.fullmatch(word):
+                        found.add((kind, label))
+
+    for candidates in _PREFIXES.values():
+        for kind, label, regex in candidates:
+            if (kind, label) not in found and regex.search(torrent_name):
+                found.add((kind, label))
+
+    return found
+
+
+def detect_release(torrent_name):
+    """Returns (quality, quality spec, languages) of a release name, as detect_quality, detect_quality_spec and
+    detect_languages would."""
+    return _get_release(_find_labels(torrent_name))
+
+
+def parse_release(torrent_name):
+    """Parses everything the filters, sorters and formatter need from a release name, in a ReleaseInfo."""
+    found = _find_labels(torrent_name)
+    quality, qualities, languages = _get_release(found)
+
+    codec = next((label for label in CODEC_PATTERNS if (CODEC, label) in found), None)
+
+    season_episode = parse_season_episode(torrent_name)
+    group = _GROUP.search(torrent_name)
+
+    return ReleaseInfo(quality, tuple(qualities) if qualities else (), tuple(languages), season_episode.seasons,
+                       season_episode.episodes, codec, group.group(1) if group else None)
+
+
+# Parsed titles are immutable, the same ReleaseInfo can be shared by every result (and every search) with that title
+_parse_release_memo = lru_cache(maxsize=int(os.getenv("RELEASE_DETECTION_CACHE_SIZE", 20000)))(parse_release)
+
+
+def detect_batch(torrent_names):
+    """Returns the ReleaseInfo of every name. Names seen recently (cross-seeded releases, popular searches) come from
+    a bounded LRU memo instead of being parsed again."""
+    return [_parse_release_memo(torrent_name) for torrent_name in torrent_names]
+
+
+def get_detection_cache_stats():
+    cache_info = _parse_release_memo.cache_info()
+    return {
+        "hits": cache_info.hits,
+        "misses": cache_info.misses,
+        "size": cache_info.currsize,
+        "max_size": cache_info.maxsize
     }
 
-    languages = []
-    for language, pattern in language_patterns.items():
-        if re.search(pattern, torrent_name, re.IGNORECASE):
-            languages.append(language)
 
-    if re.search(r'\bMULTI\b', torrent_name, re.IGNORECASE):
+def _get_release(found):
+    quality = next((label for label in QUALITY_PATTERNS if (QUALITY, label) in found), "Unknown")
+
+    qualities = [label for label in QUALITY_SPEC_PATTERNS if (QUALITY_SPEC, label) in found]
+
+    languages = [label for label in LANGUAGE_PATTERNS if (LANGUAGE, label) in found]
+    if (LANGUAGE, "multi") in found:
         languages.append("multi")
 
-    if len(languages) == 0:
-        return ["en"]
+    return quality, qualities if qualities else None, languages if languages else ["en"]
+
+
+def detect_quality(torrent_name):
+    return detect_release(torrent_name)[0]
+
+
+def detect_and_format_quality_spec(torrent_name):
+    qualities = detect_quality_spec(torrent_name)
+    return "/".join(qualities) if qualities else "Unknown"
+
 
-    return languages
+def detect_quality_spec(torrent_name):
+    return detect_release(torrent_name)[1]
+
+
+def detect_languages(torrent_name):
+    return detect_release(torrent_name)[2]
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+NETWORK = "network"  # Blocking network calls (torrent downloads, metadata and debrid APIs)
+CPU = "cpu"  # Parsing and formatting, kept off the event loop
+
+
+class BoundedExecutor:
+    """Thread pool shared by every request, with a bounded queue.
+
+    At most max_workers tasks run at once and max_queue_size wait for a worker. Past that, submitting waits for a slot
+    (back-pressure) instead of piling up work nobody will wait for. Queue depth and time spent waiting for a worker are
+    tracked for get_stats().
+
+    A slot is given back when its task's Future is done, also when the task was cancelled before a worker picked it.
+    Coroutines waiting for a slot (run) wait on the event loop, not on a thread.
+    """
+
+    def __init__(self, name, max_workers, max_queue_size):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.__slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        self.__lock = threading.Lock()
+        self.__waiters = deque()  # asyncio Futures of the coroutines waiting for a slot, first come first served
+        self.__queued = 0
+        self.__running = 0
+        self.__completed = 0
+        self.__total_wait_time = 0
+        self.__max_wait_time = 0
+
+    def submit(self, function, *args):
+        """Runs the function in the pool, waiting for a slot if the queue is full. Returns a Future."""
+        if not self.__slots.acquire(blocking=False):
+            logger.debug(f"Executor {self.name} is full, waiting for a slot")
+            self.__slots.acquire()
+
+        return self.__submit(function, *args)
+
+    async def run(self, function, *args):
+        """Runs the function in the pool and waits for its result, without blocking the event loop."""
+        if not self.__slots.acquire(blocking=False):
+            logger.debug(f"Executor {self.name} is full, waiting for a slot")
+            await self.__wait_for_slot()
+
+        return await asyncio.wrap_future(self.__submit(function, *args))
+
+    def map(self, function, iterable):
+        """Runs the function on every element in the pool and returns the results, in order."""
+        futures = [self.submit(function, element) for element in iterable]
+        return [future.result() for future in futures]
+
+    def get_stats(self):
+        with self.__lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "queued": self.__queued,
+                "running": self.__running,
+                "completed": self.__completed,
+                "average_wait_time": self.__total_wait_time / self.__completed if self.__completed > 0 else 0,
+                "max_wait_time": self.__max_wait_time
+            }
+
+    def __submit(self, function, *args):
+        with self.__lock:
+            self.__queued += 1
+
+        try:
+            future = self.__executor.submit(self.__run_task, time.time(), function, *args)
+        except BaseException:
+            with self.__lock:
+                self.__queued -= 1
+            self.__release_slot()
+            raise
+
+        future.add_done_callback(self.__on_task_done)
+        return future
+
+    def __run_task(self, submitted_at, function, *args):
+        wait_time = time.time() - submitted_at
+        with self.__lock:
+            self.__queued -= 1
+            self.__running += 1
+            self.__total_wait_time += wait_time
+            self.__max_wait_time = max(self.__max_wait_time, wait_time)
+
+        try:
+            return function(*args)
+        finally:
+            with self.__lock:
+                self.__running -= 1
+                self.__completed += 1
+
+    def __on_task_done(self, future):
+        if future.cancelled():
+            # Cancelled while queued (like an awaiting coroutine that got cancelled), __run_task never ran
+            with self.__lock:
+                self.__queued -= 1
+
+        self.__release_slot()
+
+    async def __wait_for_slot(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = loop.create_future()
+            with self.__lock:
+                self.__waiters.append(waiter)
+
+            # A slot may have been released before the waiter was registered
+            if self.__slots.acquire(blocking=False):
+                self.__remove_waiter(waiter)
+                return
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.__wake_next_waiter()  # Woken but cancelled before resuming, another waiter gets the slot
+                raise
+            finally:
+                self.__remove_waiter(waiter)
+
+            # Sync submits don't queue behind waiters, the slot may be gone already
+            if self.__slots.acquire(blocking=False):
+                return
+
+    def __release_slot(self):
+        self.__slots.release()
+        self.__wake_next_waiter()
+
+    def __wake_next_waiter(self):
+        with self.__lock:
+            waiter = self.__waiters.popleft() if len(self.__waiters) > 0 else None
+
+        if waiter is not None:
+            waiter.get_loop().call_soon_threadsafe(self.__wake_waiter, waiter)
+
+    def __wake_waiter(self, waiter):
+        if waiter.done():
+            self.__wake_next_waiter()  # Cancelled meanwhile
+        else:
+            waiter.set_result(None)
+
+    def __remove_waiter(self, waiter):
+        with self.__lock:
+            if waiter in self.__waiters:
+                self.__waiters.remove(waiter)
+
+
+executors = {
+    NETWORK: BoundedExecutor(NETWORK,
+                             int(os.getenv("NETWORK_EXECUTOR_MAX_WORKERS", 32)),
+                             int(os.getenv("NETWORK_EXECUTOR_MAX_QUEUE_SIZE", 1024))),
+    CPU: BoundedExecutor(CPU,
+                         int(os.getenv("CPU_EXECUTOR_MAX_WORKERS", os.cpu_count() or 4)),
+                         int(os.getenv("CPU_EXECUTOR_MAX_QUEUE_SIZE", 256)))
+}
+
+
+def get_executor(name):
+    return executors[name]
+
+
+def get_executors_stats():
+    return {name: executor.get_stats() for name, executor in executors.items()}
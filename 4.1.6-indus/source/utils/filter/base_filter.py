@@ -3,13 +3,28 @@ class BaseFilter:
         self.config = config
         self.item_type = additional_config
 
-    def filter(self, data):
+    def filter(self, data, media=None):
+        return [item for item in data if self.keep(item, media)]
+
+    def keep(self, item, media=None):
+        """Returns True if the item passes the filter. Filters deciding on each item alone implement this, so they
+        can be fused with others into a single pass (see FilterPipeline)."""
         raise NotImplementedError
 
+    def keep_batch(self, batch, media=None):
+        """Returns a boolean array of the rows of a ResultBatch passing the filter, or None if the filter can only decide
+        item by item (see keep)."""
+        return None
+
+    def filter_batch(self, batch, rows, media=None):
+        """Returns the rows (positions in a ResultBatch) passing a filter that needs the whole list, or None if the
+        filter only works on items (see filter)."""
+        return None
+
     def can_filter(self):
         raise NotImplementedError
 
-    def __call__(self, data):
+    def __call__(self, data, media=None):
         if self.config is not None and self.can_filter():
-            return self.filter(data)
+            return self.filter(data, media)
         return data
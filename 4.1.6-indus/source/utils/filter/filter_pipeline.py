@@ -0,0 +1,157 @@
+import numpy as np
+
+from utils.logger import setup_logger
+from utils.result_batch import ResultBatch, use_result_batch
+
+logger = setup_logger(__name__)
+
+
+class FilterPipeline:
+    """Filters of a config fused into a single pass over the items.
+
+    Every item goes through the per-item checks (BaseFilter.keep) until one rejects it. The checks are ordered by the
+    share of items they dropped so far, so the most selective one runs first and most items are rejected after a single
+    check. Filters that need the whole list (like results per quality) run afterwards, in their declared order.
+
+    Long lists (see utils.result_batch) are filtered on columns: the filters deciding on the columns alone
+    (BaseFilter.keep_batch) run first as array operations, the other checks only see the rows they kept.
+    """
+
+    def __init__(self, filters, list_filters=None):
+        self.__filters = filters  # name -> BaseFilter implementing keep()
+        self.__list_filters = list_filters if list_filters is not None else dict()  # name -> BaseFilter
+        self.__checked = {name: 0 for name in filters}  # name -> items checked
+        self.__dropped = {name: 0 for name in filters}  # name -> items dropped
+
+    def __call__(self, items, media=None):
+        stages = self.__get_ordered_stages()
+        dropped = {name: 0 for name, _ in stages}
+
+        batch = self.__get_batch(items)
+        if batch is not None:
+            filtered_items = self.__filter_batch(batch, stages, dropped, media)
+        else:
+            filtered_items = self.__filter_items(items, stages, dropped, media)
+            self.__record(stages, len(items), dropped)
+
+            for name, filter_instance in self.__list_filters.items():
+                filtered_items = self.__apply_list_filter(name, filter_instance, filtered_items, dropped, media)
+
+        logger.info(f"Filtered {len(items)} items down to {len(filtered_items)}, dropped per filter: {dropped}")
+        return filtered_items
+
+    def get_stats(self):
+        return {
+            name: {
+                "checked": self.__checked[name],
+                "dropped": self.__dropped[name]
+            } for name in self.__filters
+        }
+
+    def __filter_items(self, items, stages, dropped, media):
+        failed_stages = set()
+
+        filtered_items = []
+        for item in items:
+            for name, filter_instance in stages:
+                if name in failed_stages:
+                    continue
+
+                try:
+                    if not filter_instance.keep(item, media):
+                        dropped[name] += 1
+                        break
+                except Exception as e:
+                    # Same as before the filters were fused, a broken filter is skipped instead of failing the search
+                    logger.error(f"Error while filtering by {name}", exc_info=e)
+                    failed_stages.add(name)
+            else:
+                filtered_items.append(item)
+
+        return filtered_items
+
+    def __filter_batch(self, batch, stages, dropped, media):
+        kept = None
+        column_stages = []
+        item_stages = []
+        for name, filter_instance in stages:
+            try:
+                mask = filter_instance.keep_batch(batch, media)
+            except Exception as e:
+                logger.error(f"Error while filtering by {name}", exc_info=e)
+                continue
+
+            if mask is None:
+                item_stages.append((name, filter_instance))
+                continue
+
+            # Drops are only counted on the rows the previous stages kept, as in a single pass
+            dropped[name] = int((~mask).sum()) if kept is None else int((kept & ~mask).sum())
+            kept = mask if kept is None else kept & mask
+            column_stages.append((name, filter_instance))
+
+        rows = batch.get_rows(kept)
+        self.__record(column_stages, len(batch), dropped)
+
+        if len(item_stages) > 0:
+            items = batch.take(rows)
+            kept_items = {id(item) for item in self.__filter_items(items, item_stages, dropped, media)}
+            rows = rows[np.array([id(item) in kept_items for item in items], dtype=bool)]
+            self.__record(item_stages, len(items), dropped)
+
+        filtered_items = None
+        for name, filter_instance in self.__list_filters.items():
+            if filtered_items is None:
+                try:
+                    filtered_rows = filter_instance.filter_batch(batch, rows, media)
+                except Exception as e:
+                    logger.error(f"Error while filtering by {name}", exc_info=e)
+                    continue
+
+                if filtered_rows is not None:
+                    dropped[name] = len(rows) - len(filtered_rows)
+                    rows = filtered_rows
+                    continue
+
+                filtered_items = batch.take(rows)
+
+            filtered_items = self.__apply_list_filter(name, filter_instance, filtered_items, dropped, media)
+
+        return filtered_items if filtered_items is not None else batch.take(rows)
+
+    def __apply_list_filter(self, name, filter_instance, items, dropped, media):
+        try:
+            filtered_items = filter_instance(items, media)
+            dropped[name] = len(items) - len(filtered_items)
+            return filtered_items
+        except Exception as e:
+            logger.error(f"Error while filtering by {name}", exc_info=e)
+            return items
+
+    def __record(self, stages, checked, dropped):
+        # Stages only see the items that went through the previous ones
+        remaining = checked
+        for name, _ in stages:
+            self.__checked[name] += remaining
+            self.__dropped[name] += dropped[name]
+            remaining -= dropped[name]
+
+    def __get_batch(self, items):
+        if not use_result_batch(items):
+            return None
+
+        try:
+            return ResultBatch(items)
+        except ValueError as e:
+            logger.debug(f"Filtering item by item: {e}")
+            return None
+
+    def __get_ordered_stages(self):
+        # Filters that never ran keep their declared order (sorted() is stable)
+        return sorted(self.__filters.items(), key=lambda stage: -self.__get_drop_rate(stage[0]))
+
+    def __get_drop_rate(self, name):
+        if self.__checked[name] == 0:
+            return 0
+
+        return self.__dropped[name] / self.__checked[name]
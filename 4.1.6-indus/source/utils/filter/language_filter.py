@@ -8,20 +8,20 @@ class LanguageFilter(BaseFilter):
     def __init__(self, config):
         super().__init__(config)
 
-    def filter(self, data):
-        filtered_data = []
-        for torrent in data:
-            if len(torrent.languages) == 0:
-                continue
-
-            for language in torrent.languages:
-                if language in self.config['languages']:
-                    filtered_data.append(torrent)
-                    continue
-
-            if "multi" in torrent.languages:
-                filtered_data.append(torrent)
-        return filtered_data
+    def keep(self, item, media=None):
+        languages = item.release_info.languages
+        if len(languages) == 0:
+            return False
+
+        for language in languages:
+            if language in self.config['languages']:
+                return True
+
+        return "multi" in languages
+
+    def keep_batch(self, batch, media=None):
+        languages = batch.get_language_mask(list(self.config['languages']) + ["multi"])
+        return (batch.languages & languages) != 0
 
     def can_filter(self):
         return self.config['languages'] is not None
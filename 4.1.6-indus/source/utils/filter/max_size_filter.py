@@ -8,12 +8,11 @@ class MaxSizeFilter(BaseFilter):
     def __init__(self, config, additional_config=None):
         super().__init__(config, additional_config)
 
-    def filter(self, data):
-        filtered_data = []
-        for torrent in data:
-            if torrent.size <= self.config['maxSize']:
-                filtered_data.append(torrent)
-        return filtered_data
+    def keep(self, item, media=None):
+        return item.size <= self.config['maxSize']
+
+    def keep_batch(self, batch, media=None):
+        return batch.size <= self.config['maxSize']
 
     def can_filter(self):
         return int(self.config['maxSize']) > 0 and self.item_type == 'movie'
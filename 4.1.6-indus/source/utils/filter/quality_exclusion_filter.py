@@ -1,4 +1,5 @@
-from utils.detection import detect_quality_spec
+import numpy as np
+
 from utils.filter.base_filter import BaseFilter
 from utils.logger import setup_logger
 
@@ -8,30 +9,38 @@ logger = setup_logger(__name__)
 class QualityExclusionFilter(BaseFilter):
     def __init__(self, config):
         super().__init__(config)
+        self.excluded_qualities = [quality.upper() for quality in config['exclusion']] \
+            if config is not None and config.get('exclusion') is not None else []
+        self.rips = "RIPS" in self.excluded_qualities
+        self.cams = "CAM" in self.excluded_qualities
 
     RIPS = ["HDRIP", "BRRIP", "BDRIP", "WEBRIP", "TVRIP", "VODRIP", "HDRIP"]
     CAMS = ["CAM", "TS", "TC", "R5", "DVDSCR", "HDTV", "PDTV", "DSR", "WORKPRINT", "VHSRIP", "HDCAM"]
 
-    def filter(self, data):
-        filtered_items = []
-        excluded_qualities = [quality.upper() for quality in self.config['exclusion']]
-        rips = "RIPS" in excluded_qualities
-        cams = "CAM" in excluded_qualities
-
-        for stream in data:
-            if stream.quality.upper() not in excluded_qualities:
-                detection = detect_quality_spec(stream.title)
-                if detection is not None:
-                    for item in detection:
-                        if rips and item.upper() in self.RIPS:
-                            break
-                        if cams and item.upper() in self.CAMS:
-                            break
-                    else:
-                        filtered_items.append(stream)
-                elif "Unknown" not in excluded_qualities:
-                    filtered_items.append(stream)
-        return filtered_items
+    def keep(self, item, media=None):
+        if item.release_info.quality.upper() in self.excluded_qualities:
+            return False
+
+        detection = item.release_info.quality_spec
+        if len(detection) == 0:
+            return "Unknown" not in self.excluded_qualities
+
+        for quality_spec in detection:
+            if self.rips and quality_spec.upper() in self.RIPS:
+                return False
+            if self.cams and quality_spec.upper() in self.CAMS:
+                return False
+        return True
+
+    def keep_batch(self, batch, media=None):
+        excluded_qualities = batch.get_quality_codes(lambda quality: quality.upper() in self.excluded_qualities)
+        keep = ~np.isin(batch.qualities, excluded_qualities)
+
+        if "Unknown" in self.excluded_qualities:
+            keep &= batch.quality_specs != 0
+
+        excluded_specs = batch.get_quality_spec_mask((self.RIPS if self.rips else []) + (self.CAMS if self.cams else []))
+        return keep & ((batch.quality_specs & excluded_specs) == 0)
 
     def can_filter(self):
         return self.config['exclusion'] is not None and len(self.config['exclusion']) > 0
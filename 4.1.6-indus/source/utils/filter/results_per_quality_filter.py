@@ -1,3 +1,5 @@
+import numpy as np
+
 from utils.filter.base_filter import BaseFilter
 from utils.logger import setup_logger
 
@@ -8,19 +10,31 @@ class ResultsPerQualityFilter(BaseFilter):
     def __init__(self, config):
         super().__init__(config)
 
-    def filter(self, data):
+    def filter(self, data, media=None):
         filtered_items = []
         quality_count = {}
         for item in data:
-            if item.quality not in quality_count:
-                quality_count[item.quality] = 1
+            quality = item.release_info.quality
+            if quality not in quality_count:
+                quality_count[quality] = 1
                 filtered_items.append(item)
             else:
-                if quality_count[item.quality] < int(self.config['resultsPerQuality']):
-                    quality_count[item.quality] += 1
+                if quality_count[quality] < int(self.config['resultsPerQuality']):
+                    quality_count[quality] += 1
                     filtered_items.append(item)
 
         return filtered_items
 
+    def filter_batch(self, batch, rows, media=None):
+        # Rank of each row among the rows of its quality, kept in the list order
+        qualities = batch.qualities[rows]
+        order = np.argsort(qualities, kind='stable')
+        sorted_qualities = qualities[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_qualities[1:] != sorted_qualities[:-1]])
+        ranks = np.empty(len(rows), dtype=np.int64)
+        ranks[order] = np.arange(len(rows)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(rows)]))
+
+        return rows[ranks < int(self.config['resultsPerQuality'])]
+
     def can_filter(self):
         return self.config['resultsPerQuality'] is not None and int(self.config['resultsPerQuality']) > 0
@@ -0,0 +1,27 @@
+from utils.filter.base_filter import BaseFilter
+from utils.logger import setup_logger
+from utils.season_episode import get_number
+
+logger = setup_logger(__name__)
+
+
+class SeasonEpisodeFilter(BaseFilter):
+    """Filters out the series torrents that are 100% not matching the searched season and episode."""
+
+    def __init__(self, config, additional_config=None):
+        super().__init__(config, additional_config)
+
+    def keep(self, item, media=None):
+        # Season packs (and ranges like S01-S03 or S01E01-E05) tell several numbers, any of them can match
+        seasons = item.release_info.seasons
+        if len(seasons) > 0 and get_number(media.season) not in seasons:
+            return False
+
+        episodes = item.release_info.episodes
+        if len(episodes) > 0 and get_number(media.episode) not in episodes:
+            return False
+
+        return True
+
+    def can_filter(self):
+        return self.item_type == 'series'
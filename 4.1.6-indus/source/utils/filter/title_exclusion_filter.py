@@ -1,4 +1,5 @@
 from utils.filter.base_filter import BaseFilter
+from utils.keyword_matcher import get_keyword_matcher
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -7,17 +8,11 @@ logger = setup_logger(__name__)
 class TitleExclusionFilter(BaseFilter):
     def __init__(self, config):
         super().__init__(config)
+        self.keyword_matcher = get_keyword_matcher(tuple(config['exclusionKeywords'])) \
+            if config is not None and config.get('exclusionKeywords') is not None else None
 
-    def filter(self, data):
-        filtered_items = []
-        excluded_keywords = [keyword.upper() for keyword in self.config['exclusionKeywords']]
-        for stream in data:
-            for keyword in excluded_keywords:
-                if keyword in stream.title.upper():
-                    break
-            else:
-                filtered_items.append(stream)
-        return filtered_items
+    def keep(self, item, media=None):
+        return not self.keyword_matcher.matches(item.title)
 
     def can_filter(self):
         return self.config['exclusionKeywords'] is not None and len(self.config['exclusionKeywords']) > 0
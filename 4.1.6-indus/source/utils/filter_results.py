@@ -1,9 +1,12 @@
-import re
+import json
+from collections import OrderedDict
 
+from utils.filter.filter_pipeline import FilterPipeline
 from utils.filter.language_filter import LanguageFilter
 from utils.filter.max_size_filter import MaxSizeFilter
 from utils.filter.quality_exclusion_filter import QualityExclusionFilter
 from utils.filter.results_per_quality_filter import ResultsPerQualityFilter
+from utils.filter.season_episode_filter import SeasonEpisodeFilter
 from utils.filter.title_exclusion_filter import TitleExclusionFilter
 from utils.logger import setup_logger
 
@@ -11,21 +14,10 @@ logger = setup_logger(__name__)
 
 quality_order = {"4k": 0, "1080p": 1, "720p": 2, "480p": 3}
 
-
-def sort_quality(item):
-    return quality_order.get(item.quality, float('inf')), item.quality is None
-
-
-def items_sort(items, config):
-    if config['sort'] == "quality":
-        return sorted(items, key=sort_quality)
-    if config['sort'] == "sizeasc":
-        return sorted(items, key=lambda x: int(x.size))
-    if config['sort'] == "sizedesc":
-        return sorted(items, key=lambda x: int(x.size), reverse=True)
-    if config['sort'] == "qualitythensize":
-        return sorted(items, key=lambda x: (sort_quality(x), -int(x.size)))
-    return items
+# Config fields read by the filters, compiled filters are shared by the configs having the same values for those
+FILTER_CONFIG_KEYS = ['languages', 'maxSize', 'exclusionKeywords', 'exclusion', 'resultsPerQuality']
+FILTER_CACHE_SIZE = 256
+compiled_filters = OrderedDict()  # config fingerprint -> FilterPipeline
 
 
 # def filter_season_episode(items, season, episode, config):
@@ -43,57 +35,53 @@ def items_sort(items, config):
 #         filtered_items.append(item)
 #     return filtered_items
 
-def filter_out_non_matching(items, season, episode):
-    filtered_items = []
-    for item in items:
-        title = item.title.upper()
-        season_pattern = r'S\d+'
-        episode_pattern = r'E\d+'
-
-        season_substrings = re.findall(season_pattern, title)
-        if len(season_substrings) > 0 and season not in season_substrings:
-            continue
-
-        episode_substrings = re.findall(episode_pattern, title)
-        if len(episode_substrings) > 0 and episode not in episode_substrings:
-            continue
+def get_filter_pipeline(config, media_type):
+    """Returns the compiled filters of a config. Most users share a handful of configs, so they are cached by the
+    config fields the filters read."""
+    fingerprint = json.dumps([media_type] + [config.get(key) for key in FILTER_CONFIG_KEYS])
 
-        filtered_items.append(item)
+    pipeline = compiled_filters.get(fingerprint)
+    if pipeline is not None:
+        compiled_filters.move_to_end(fingerprint)
+        return pipeline
 
-    return filtered_items
-
-
-def filter_items(items, media, config):
     filters = {
+        "seasonEpisode": SeasonEpisodeFilter(config, media_type),  # Filtering out 100% non matching for series
         #"languages": LanguageFilter(config),
-        #"maxSize": MaxSizeFilter(config, media.type),  # Max size filtering only happens for movies, so it
+        #"maxSize": MaxSizeFilter(config, media_type),  # Max size filtering only happens for movies, so it
         "exclusionKeywords": TitleExclusionFilter(config),
         "exclusion": QualityExclusionFilter(config),
+    }
+    list_filters = {
         #"resultsPerQuality": ResultsPerQualityFilter(config)
     }
 
-    # Filtering out 100% non matching for series
-    logger.info(f"Item count before filtering: {len(items)}")
-    if media.type == "series":
-        logger.info(f"Filtering out non matching series torrents")
-        items = filter_out_non_matching(items, media.season, media.episode)
-        logger.info(f"Item count changed to {len(items)}")
+    pipeline = FilterPipeline(get_usable_filters(filters), get_usable_filters(list_filters))
 
-    for filter_name, filter_instance in filters.items():
+    compiled_filters[fingerprint] = pipeline
+    while len(compiled_filters) > FILTER_CACHE_SIZE:
+        compiled_filters.popitem(last=False)
+
+    return pipeline
+
+
+def get_usable_filters(filters):
+    usable_filters = dict()
+    for name, filter_instance in filters.items():
         try:
-            logger.info(f"Filtering by {filter_name}: " + str(config[filter_name]))
-            items = filter_instance(items)
-            logger.info(f"Item count changed to {len(items)}")
+            if filter_instance.can_filter():
+                usable_filters[name] = filter_instance
         except Exception as e:
-            logger.error(f"Error while filtering by {filter_name}", exc_info=e)
+            # Older configs may lack the fields of a filter, it's skipped instead of failing every search
+            logger.error(f"Error while checking filter {name}", exc_info=e)
+
+    return usable_filters
+
+
+def filter_items(items, media, config):
+    logger.info(f"Item count before filtering: {len(items)}")
+    items = get_filter_pipeline(config, media.type)(items, media)
     logger.info(f"Item count after filtering: {len(items)}")
     logger.info("Finished filtering torrents")
 
     return items
-
-
-def sort_items(items, config):
-    if config['sort'] is not None:
-        return items_sort(items, config)
-    else:
-        return items
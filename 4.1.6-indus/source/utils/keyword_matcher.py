@@ -0,0 +1,86 @@
+from collections import deque
+from functools import lru_cache
+
+# Below this amount of keywords, looking for each keyword in the text (one C level scan each) is faster than walking
+# the automaton in Python, see benchmarks/keyword_matcher_benchmark.py
+AUTOMATON_MIN_KEYWORDS = 32
+
+
+class KeywordMatcher:
+    """Tells if a text contains any of a set of keywords, case insensitively (like `keyword.upper() in text.upper()`).
+
+    With many keywords, they are compiled into an Aho-Corasick automaton, turned into a DFA: every (state, character)
+    has a direct transition, so the text is scanned once, one dict lookup per character, whatever the amount of
+    keywords.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({keyword.upper() for keyword in keywords})
+        self.__match_all = "" in self.keywords  # An empty keyword is in every text
+        self.__transitions = None  # state -> {character -> state}
+        self.__accepting = None  # state -> True if a keyword ends at this state
+
+        if len(self.keywords) >= AUTOMATON_MIN_KEYWORDS:
+            self.__build_automaton()
+
+    def matches(self, text):
+        if self.__match_all:
+            return True
+
+        text = text.upper()
+
+        if self.__transitions is None:
+            for keyword in self.keywords:
+                if keyword in text:
+                    return True
+            return False
+
+        transitions = self.__transitions
+        accepting = self.__accepting
+        state = 0
+        for character in text:
+            state = transitions[state].get(character, 0)
+            if accepting[state]:
+                return True
+        return False
+
+    def __build_automaton(self):
+        # Trie of the keywords
+        trie = [dict()]
+        accepting = [False]
+        for keyword in self.keywords:
+            state = 0
+            for character in keyword:
+                if character not in trie[state]:
+                    trie.append(dict())
+                    accepting.append(False)
+                    trie[state][character] = len(trie) - 1
+                state = trie[state][character]
+            accepting[state] = True
+
+        # Breadth first, every state inherits the transitions of its failure state (the longest proper suffix of its
+        # path that is also in the trie), then overrides them with its own
+        failures = [0] * len(trie)
+        transitions = [dict() for _ in trie]
+        transitions[0] = dict(trie[0])
+        queue = deque(trie[0].values())
+        while len(queue) > 0:
+            state = queue.popleft()
+            failure = failures[state]
+            accepting[state] = accepting[state] or accepting[failure]
+            transitions[state] = dict(transitions[failure])
+
+            for character, next_state in trie[state].items():
+                failures[next_state] = transitions[failure].get(character, 0)
+                queue.append(next_state)
+
+            transitions[state].update(trie[state])
+
+        self.__transitions = transitions
+        self.__accepting = accepting
+
+
+@lru_cache(maxsize=256)
+def get_keyword_matcher(keywords):
+    """Returns the matcher of a tuple of keywords, built once per keyword set."""
+    return KeywordMatcher(keywords)
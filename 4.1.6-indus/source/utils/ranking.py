@@ -0,0 +1,120 @@
+import heapq
+
+import numpy as np
+
+from utils.filter_results import quality_order
+from utils.logger import setup_logger
+from utils.result_batch import ResultBatch, use_result_batch
+
+logger = setup_logger(__name__)
+
+DEBRID_STREAM = 0  # Instantly available on the debrid service
+DIRECT_TORRENT_STREAM = 1  # Public torrent, streamed by Stremio itself
+NO_STREAM = 2  # Neither, the item can't be shown
+
+UNKNOWN_QUALITY_RANK = len(quality_order)
+
+
+def get_stream_rank(torrent_item, config):
+    if config['debrid'] and torrent_item.availability:
+        return DEBRID_STREAM
+
+    if config['torrenting'] and torrent_item.privacy != "private":
+        return DIRECT_TORRENT_STREAM
+
+    return NO_STREAM
+
+
+def get_sort_key(torrent_item, sort):
+    """Numeric key of an item for a config['sort'] mode, lower is better. Unknown modes keep the original order."""
+    if sort == "quality":
+        key = (quality_order.get(torrent_item.release_info.quality, UNKNOWN_QUALITY_RANK),)
+    elif sort == "sizeasc":
+        key = (torrent_item.size,)
+    elif sort == "sizedesc":
+        key = (-torrent_item.size,)
+    elif sort == "qualitythensize":
+        key = (quality_order.get(torrent_item.release_info.quality, UNKNOWN_QUALITY_RANK), -torrent_item.size)
+    else:
+        return ()
+
+    # Most seeded first when everything else is equal
+    return key + (-torrent_item.seeders if torrent_item.seeders is not None else 0,)
+
+
+def rank_items(torrent_items, config, k):
+    """Returns the k best items to show, best first.
+
+    The score of each item is computed once: what kind of stream it gives (instantly available first, items giving no
+    stream at all are dropped), then the sort mode of the config, then seeders, then the original position so the
+    order is deterministic. Only the top k are kept, with a heap instead of sorting everything.
+    """
+    sort = config['sort']
+
+    scored_items = []
+    for position, torrent_item in enumerate(torrent_items):
+        stream_rank = get_stream_rank(torrent_item, config)
+        if stream_rank == NO_STREAM:
+            continue
+
+        scored_items.append(((stream_rank,) + get_sort_key(torrent_item, sort) + (position,), torrent_item))
+
+    # Positions are unique, items themselves are never compared
+    return [torrent_item for _, torrent_item in heapq.nsmallest(k, scored_items)]
+
+
+def rank_candidates(results, config):
+    """Orders Jackett results before their torrents are resolved, best first, on what is known without downloading
+    anything: the sort mode of the config, seeders, then results whose info hash is already known. Results that can't
+    give a stream whatever their availability (private ones without debrid, or anything without debrid nor
+    torrenting) are dropped."""
+    if use_result_batch(results):
+        try:
+            return rank_candidates_batch(ResultBatch(results), config)
+        except ValueError as e:
+            logger.debug(f"Ranking result by result: {e}")
+
+    sort = config['sort']
+
+    scored_results = []
+    for position, result in enumerate(results):
+        if not config['debrid'] and not (config['torrenting'] and result.privacy != "private"):
+            continue
+
+        scored_results.append((get_sort_key(result, sort) + (result.info_hash is None, position), result))
+
+    scored_results.sort(key=lambda scored_result: scored_result[0])
+    return [result for _, result in scored_results]
+
+
+def rank_candidates_batch(batch, config):
+    """rank_candidates on the columns of a ResultBatch, with a single argsort. Only the results that are kept are
+    looked up again."""
+    if config['debrid']:
+        rows = batch.get_rows()
+    elif config['torrenting']:
+        rows = batch.get_rows(~batch.private)
+    else:
+        return []
+
+    # Same keys as get_sort_key, most important first
+    sort = config['sort']
+    keys = []
+    if sort in ("quality", "qualitythensize"):
+        keys.append(batch.get_quality_values(quality_order, UNKNOWN_QUALITY_RANK))
+    if sort == "sizeasc":
+        keys.append(batch.size)
+    elif sort in ("sizedesc", "qualitythensize"):
+        keys.append(-batch.size)
+    if sort in ("quality", "sizeasc", "sizedesc", "qualitythensize"):
+        keys.append(-batch.seeders)
+    keys.append(batch.without_info_hash)
+
+    # lexsort sorts by the last key first, and is stable: rows keep the list order when everything else is equal
+    order = np.lexsort([key[rows] for key in reversed(keys)])
+    return batch.take(rows[order])
+
+
+def rank_streams(streams):
+    """Orders the streams of ranked items: debrid streams first, then direct torrents, each in the items order."""
+    return sorted(streams, key=lambda stream: DIRECT_TORRENT_STREAM if "infoHash" in stream else DEBRID_STREAM)
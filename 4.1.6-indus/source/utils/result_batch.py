@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+
+# Result lists at least this long are filtered and ranked on columns instead of item by item, 0 never does
+COLUMNAR_MIN_RESULTS = int(os.getenv("COLUMNAR_MIN_RESULTS", 0))
+
+
+def use_result_batch(results):
+    return 0 < COLUMNAR_MIN_RESULTS <= len(results)
+
+
+class ResultBatch:
+    """Columnar view of a list of results (JackettResult or TorrentItem), for filtering and sorting thousands of them
+    with array operations.
+
+    Every column has one row per result, in the order of the list. Labels (qualities, quality specs, languages) are
+    numbered per batch: qualities is the code of the quality of each row, quality_specs and languages are bitmasks of
+    the labels of each row. Results themselves are only looked up again for the rows that are kept (see take).
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+        self.__quality_labels = dict()  # quality -> code
+        self.__quality_spec_bits = dict()  # quality spec, upper case -> bit
+        self.__language_bits = dict()  # language -> bit
+
+        # Release infos are shared by the results with the same title (see utils.detection), their labels repeat a lot
+        quality_spec_masks = dict()  # quality spec tuple -> bitmask
+        language_masks = dict()  # languages tuple -> bitmask
+
+        sizes = []
+        seeders = []
+        qualities = []
+        quality_specs = []
+        languages = []
+        for result in results:
+            release_info = result.release_info
+            sizes.append(result.size or 0)
+            seeders.append(result.seeders or 0)
+            qualities.append(self.__get_code(self.__quality_labels, release_info.quality))
+
+            quality_spec_mask = quality_spec_masks.get(release_info.quality_spec)
+            if quality_spec_mask is None:
+                quality_spec_mask = quality_spec_masks[release_info.quality_spec] = self.__get_bits(
+                    self.__quality_spec_bits, [quality_spec.upper() for quality_spec in release_info.quality_spec])
+            quality_specs.append(quality_spec_mask)
+
+            language_mask = language_masks.get(release_info.languages)
+            if language_mask is None:
+                language_mask = language_masks[release_info.languages] = self.__get_bits(self.__language_bits,
+                                                                                         release_info.languages)
+            languages.append(language_mask)
+
+        self.size = np.array(sizes, dtype=np.int64)
+        self.seeders = np.array(seeders, dtype=np.int64)
+        self.qualities = np.array(qualities, dtype=np.int32)
+        self.quality_specs = np.array(quality_specs, dtype=np.uint64)
+        self.languages = np.array(languages, dtype=np.uint64)
+        self.private = np.array([result.privacy == "private" for result in results], dtype=bool)
+        self.without_info_hash = np.array([result.info_hash is None for result in results], dtype=bool)
+
+    def __len__(self):
+        return len(self.results)
+
+    def get_rows(self, mask=None):
+        """Returns the positions of the rows a boolean mask keeps (every row without mask)."""
+        return np.flatnonzero(mask) if mask is not None else np.arange(len(self.results))
+
+    def take(self, rows):
+        """Returns the results of rows (positions), in that order."""
+        results = self.results
+        return [results[row] for row in rows.tolist()]
+
+    def get_quality_codes(self, predicate):
+        """Returns the codes of the qualities of this batch a predicate is true for."""
+        return np.array([code for quality, code in self.__quality_labels.items() if predicate(quality)],
+                        dtype=np.int32)
+
+    def get_quality_values(self, values, default):
+        """Returns a column mapping the quality of each row through a dict (like the quality order)."""
+        values_by_code = np.full(max(len(self.__quality_labels), 1), default, dtype=np.int64)
+        for quality, code in self.__quality_labels.items():
+            values_by_code[code] = values.get(quality, default)
+
+        return values_by_code[self.qualities]
+
+    def get_quality_spec_mask(self, quality_specs):
+        """Returns the bitmask of the quality specs (upper case) found in this batch."""
+        return self.__get_mask(self.__quality_spec_bits, quality_specs)
+
+    def get_language_mask(self, languages):
+        """Returns the bitmask of the languages found in this batch."""
+        return self.__get_mask(self.__language_bits, languages)
+
+    @staticmethod
+    def __get_code(codes, label):
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(codes)
+
+        return code
+
+    @staticmethod
+    def __get_bits(bits, labels):
+        mask = 0
+        for label in labels:
+            bit = bits.get(label)
+            if bit is None:
+                if len(bits) == 64:
+                    raise ValueError("More than 64 different labels in a result batch")
+                bit = bits[label] = 1 << len(bits)
+            mask |= bit
+
+        return mask
+
+    @staticmethod
+    def __get_mask(bits, labels):
+        mask = 0
+        for label in labels:
+            mask |= bits.get(label, 0)
+
+        return np.uint64(mask)
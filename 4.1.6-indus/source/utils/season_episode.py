@@ -0,0 +1,179 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from utils.general import is_video_file
+
+# Season and episode numbers found in a release or file name.
+#   seasons, episodes: frozensets of numbers, ranges expanded (S01E01-E03 -> episodes 1, 2 and 3)
+#   strict: True if an episode is tied to its season by S and E markers (S01E02, Season 1 Episode 2)
+SeasonEpisode = namedtuple('SeasonEpisode', ['seasons', 'episodes', 'strict'])
+
+NO_MATCH = 0
+LOOSE_MATCH = 1  # 1x02, E02 alone with the season elsewhere in the path, "02 - Title.mkv"
+STRICT_MATCH = 2  # S01E02
+
+_MAX_RANGE = 100  # S01E01-E720 is a resolution, not 720 episodes
+
+_SEASON_MARKER = r'(?:S|(?:SEASONS?|SAISONS?|TEMPORADAS?|STAFFEL)[ ._]?)'
+_EPISODE_MARKER = r'(?:E|(?:EPISODES?|EPISODIOS?|EP)[ ._]?)'
+# More episodes after the first one: S01E01E02, S01E01-E03, S01E01-03, S01E01 - E03
+_EPISODE_TAIL = r'(?:-E?\d{1,4}(?![\dP])|[ ._]?-[ ._]?E\d{1,4}(?!\d)|[ ._]?E\d{1,4}(?!\d))*'
+
+# Names are matched upper case, episode numbers are always whole digit runs (see _get_episode_screen)
+
+# 1x02, but not the audio channels and codec of "DD5.1x264" or "AAC2.0x265"
+_CROSS_SEASON_EPISODE = r'(?<!\d\.)(?P<cross_season>\d{1,2})X(?!26[45](?!\d))(?P<cross_episode>\d{2,3})'
+
+_SEASON_EPISODE = re.compile(
+    r'(?<![A-Z0-9])(?:'
+    rf'{_SEASON_MARKER}(?P<season>\d{{1,4}})[ ._-]?'
+    rf'{_EPISODE_MARKER}(?P<episode>\d{{1,4}})(?!\d)(?P<tail>{_EPISODE_TAIL})'
+    rf'|{_CROSS_SEASON_EPISODE}(?:-(?:\d{{1,2}}X)?(?P<cross_last>\d{{2,3}}))?(?![\dA-Z])'
+    rf'|{_SEASON_MARKER}(?P<season_only>\d{{1,4}})'
+    rf'(?:[ ._]?-[ ._]?{_SEASON_MARKER}?(?P<season_last>\d{{1,4}}))?(?![\dA-Z])'
+    rf'|{_EPISODE_MARKER}(?P<episode_only>\d{{1,4}})(?P<episode_tail>{_EPISODE_TAIL})(?!\d)'
+    r')'
+)
+_TAIL_EPISODE = re.compile(r'(-?)[ ._]*E?(\d+)', re.IGNORECASE)
+# Episode number without marker, only trusted at the start of a file name or after " - " (anime releases)
+_BARE_EPISODE = re.compile(r'(?:^|\s-\s)(\d{1,3})(?=[ ._\[(v-]|$)', re.IGNORECASE)
+_DIGITS = re.compile(r'\d+')
+# Dash of an episode range (S01E01-E03, S01E01-03, 1x01-1x03), a range may hold an episode without telling its number
+_RANGE_DASH = re.compile(r'-[ ._]*[E\d]', re.IGNORECASE)
+
+
+def get_number(season_or_episode):
+    """Returns the number of a season or an episode like "S01", "E02" or "3", None if there is none."""
+    if isinstance(season_or_episode, int):
+        return season_or_episode
+
+    digits = _DIGITS.search(season_or_episode) if season_or_episode is not None else None
+    return int(digits.group(0)) if digits else None
+
+
+def parse_season_episode(name):
+    """Parses the seasons and episodes of a name in a single pass: S01E02, S01E01-E03, S01E01E02, 1x02, Season 1
+    Episode 2, season packs (S01, S01-S03, Season 1, S2024) and episodes alone (E02, EP02)."""
+    seasons = set()
+    episodes = set()
+    strict = False
+
+    for match in _SEASON_EPISODE.finditer(name.upper()):
+        season, episode, tail, cross_season, cross_episode, cross_last, season_only, season_last, episode_only, \
+            episode_tail = match.groups()
+
+        if season is not None:
+            seasons.add(int(season))
+            _add_episodes(episodes, int(episode), tail)
+            strict = True
+        elif cross_season is not None:
+            seasons.add(int(cross_season))
+            _add_range(episodes, int(cross_episode), cross_last)
+        elif season_only is not None:
+            _add_range(seasons, int(season_only), season_last)
+        else:
+            _add_episodes(episodes, int(episode_only), episode_tail)
+
+    return SeasonEpisode(frozenset(seasons), frozenset(episodes), strict)
+
+
+def parse_files(file_names):
+    """Parses a whole file list once, for match_parsed_files. Files that are not videos are None."""
+    return [_parse_file(file_name) if is_video_file(file_name) else None for file_name in file_names]
+
+
+def match_parsed_files(parsed_files, season, episode, context_seasons=frozenset()):
+    """Returns the positions of the files of the episode: the ones matching it strictly if there are some, the loosely
+    matching ones otherwise. context_seasons are the seasons of the torrent name, for files only telling the episode."""
+    season = get_number(season)
+    episode = get_number(episode)
+
+    strict_positions = []
+    loose_positions = []
+    for position, parsed_file in enumerate(parsed_files):
+        if parsed_file is None:
+            continue
+
+        match = _match(parsed_file, season, episode, context_seasons)
+        if match == STRICT_MATCH:
+            strict_positions.append(position)
+        elif match == LOOSE_MATCH and len(strict_positions) == 0:
+            loose_positions.append(position)
+
+    return strict_positions if len(strict_positions) > 0 else loose_positions
+
+
+def match_episode_files(file_names, season, episode, context_seasons=frozenset()):
+    """Classifies a file list for a single lookup, see match_parsed_files. Lists looked up once (debrid file lists)
+    aren't parsed as a whole: only the files that may be the episode are."""
+    episode_screen = _get_episode_screen(get_number(episode))
+    parsed_files = [_parse_file(file_name) if is_video_file(file_name) and episode_screen(file_name) else None
+                    for file_name in file_names]
+    return match_parsed_files(parsed_files, season, episode, context_seasons)
+
+
+# The same files come back for every episode of a pack, and from every debrid service
+@lru_cache(maxsize=50000)
+def _parse_file(file_name):
+    season_episode = parse_season_episode(file_name)
+    if len(season_episode.episodes) > 0:
+        return season_episode
+
+    bare_episodes = frozenset(int(number) for number in _BARE_EPISODE.findall(file_name.rsplit("/", 1)[-1]))
+    return season_episode._replace(episodes=bare_episodes)
+
+
+@lru_cache(maxsize=1000)
+def _get_episode_screen(episode):
+    """Returns a check that is False for the names that can't be the episode: they neither have its number as a whole
+    digit run (leading zeros aside) nor an episode range. Much cheaper than parsing them."""
+    if episode is None:
+        return lambda name: True
+
+    # The number is searched first, so only its occurrences are looked at
+    number = str(episode)
+    episode_number = re.compile(rf'{number}(?<![1-9]{number})(?!\d)')
+    return lambda name: (episode_number.search(name) is not None
+                         or ('-' in name and _RANGE_DASH.search(name) is not None))
+
+
+def _match(parsed_file, season, episode, context_seasons):
+    if episode not in parsed_file.episodes:
+        return NO_MATCH
+
+    if parsed_file.strict and season in parsed_file.seasons:
+        return STRICT_MATCH
+
+    seasons = parsed_file.seasons if len(parsed_file.seasons) > 0 else context_seasons
+    if len(seasons) == 0 or season in seasons:
+        return LOOSE_MATCH
+
+    return NO_MATCH
+
+
+def _add_episodes(episodes, first, tail):
+    episodes.add(first)
+    if not tail:
+        return
+
+    previous = first
+    for dash, number in _TAIL_EPISODE.findall(tail):
+        number = int(number)
+        if dash:
+            _add_range(episodes, previous, number)
+        else:
+            episodes.add(number)
+        previous = number
+
+
+def _add_range(numbers, first, last):
+    numbers.add(first)
+    if last is None:
+        return
+
+    last = int(last)
+    if first < last <= first + _MAX_RANGE:
+        numbers.update(range(first, last + 1))
+    else:
+        numbers.add(last)
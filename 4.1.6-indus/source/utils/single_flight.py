@@ -0,0 +1,31 @@
+import asyncio
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing the same key into a single execution.
+
+    Callers arriving while a call for their key is in flight wait for it and get the same result (or exception)
+    instead of starting their own. A caller giving up (cancelled request) doesn't cancel the call for the others.
+    """
+
+    def __init__(self):
+        self.__calls = dict()  # key -> running task
+
+    async def do(self, key, coroutine_function):
+        task = self.__calls.get(key)
+        if task is not None:
+            logger.info("Joining an identical search already in progress")
+        else:
+            task = asyncio.create_task(coroutine_function())
+            self.__calls[key] = task
+            task.add_done_callback(lambda _: self.__forget(key, task))
+
+        return await asyncio.shield(task)
+
+    def __forget(self, key, task):
+        if self.__calls.get(key) is task:
+            del self.__calls[key]
@@ -1,10 +1,9 @@
 import json
-import queue
-import threading
 from typing import List
 
 from torrent.torrent_item import TorrentItem
 from utils.logger import setup_logger
+from utils.ranking import rank_streams
 from utils.string_encoding import encodeb64
 
 logger = setup_logger(__name__)
@@ -31,46 +30,33 @@ def get_emoji(language):
     return emoji_dict.get(language, "🇬🇧")
 
 
-def filter_by_availability(item):
-    if item["name"].startswith(INSTANTLY_AVAILABLE):
-        return 0
-    else:
-        return 1
-
-
-def filter_by_direct_torrnet(item):
-    if item["name"].startswith(DIRECT_TORRENT):
-        return 1
-    else:
-        return 0
-
-
-def parse_to_debrid_stream(torrent_item: TorrentItem, configb64, config, results: queue.Queue):
+def parse_to_debrid_stream(torrent_item: TorrentItem, configb64, config, results: List[dict]):
 
     title = f"{torrent_item.title}\n"
 
     if torrent_item.file_name is not None:
         title += f"{torrent_item.file_name}\n"
 
-    size_in_gb = round(int(torrent_item.size) / 1024 / 1024 / 1024, 2)
+    size_in_gb = round(torrent_item.size / 1024 / 1024 / 1024, 2)
 
     title += f"👥 {torrent_item.seeders}   💾 {size_in_gb}GB   🔍 {torrent_item.indexer}\n"
 
-    for language in torrent_item.languages:
+    for language in torrent_item.release_info.languages:
         title += f"{get_emoji(language)}/"
     title = title[:-1]
 
+    quality_spec = torrent_item.release_info.quality_spec
+
     if config['debrid']:
         if torrent_item.availability:
             name = f"{INSTANTLY_AVAILABLE}\n"
-            name += f"{torrent_item.quality}\n"
-            if len(torrent_item.quality_spec) > 0 and torrent_item.quality_spec[0] != "Unknown" and \
-                    torrent_item.quality_spec[0] != "":
-                name += f"({'|'.join(torrent_item.quality_spec)})"
+            name += f"{torrent_item.release_info.quality}\n"
+            if len(quality_spec) > 0 and quality_spec[0] != "Unknown" and quality_spec[0] != "":
+                name += f"({'|'.join(quality_spec)})"
 
             queryb64 = encodeb64(json.dumps(torrent_item.to_debrid_stream_query())).replace('=', '%3D')
 
-            results.put({
+            results.append({
                 "name": name,
                 "description": title,
                 "url": f"{config['addonHost']}/playback/{configb64}/{queryb64}",
@@ -81,11 +67,10 @@ def parse_to_debrid_stream(torrent_item: TorrentItem, configb64, config, results
             })
 
     if config['torrenting'] and torrent_item.privacy != "private":
-        name = f"{DIRECT_TORRENT}\n{torrent_item.quality}\n"
-        if len(torrent_item.quality_spec) > 0 and torrent_item.quality_spec[0] != "Unknown" and \
-                torrent_item.quality_spec[0] != "":
-            name += f"({'|'.join(torrent_item.quality_spec)})"
-        results.put({
+        name = f"{DIRECT_TORRENT}\n{torrent_item.release_info.quality}\n"
+        if len(quality_spec) > 0 and quality_spec[0] != "Unknown" and quality_spec[0] != "":
+            name += f"({'|'.join(quality_spec)})"
+        results.append({
             "name": name,
             "description": title,
             "infoHash": torrent_item.info_hash,
@@ -99,29 +84,12 @@ def parse_to_debrid_stream(torrent_item: TorrentItem, configb64, config, results
 
 
 def parse_to_stremio_streams(torrent_items: List[TorrentItem], config):
-    stream_list = []
-    threads = []
-    thread_results_queue = queue.Queue()
-
+    """Turns the ranked items into streams, keeping their order."""
     configb64 = encodeb64(json.dumps(config).replace('=', '%3D'))
-    for torrent_item in torrent_items[:int(config['maxResults'])]:
-        thread = threading.Thread(target=parse_to_debrid_stream,
-                                  args=(torrent_item, configb64, config,
-                                        thread_results_queue),
-                                  daemon=True)
-        thread.start()
-        threads.append(thread)
-
-    for thread in threads:
-        thread.join()
 
-    while not thread_results_queue.empty():
-        stream_list.append(thread_results_queue.get())
+    # Formatting a few dozen items is cheap, it stays on the event loop instead of waiting on the CPU pool
+    streams = []
+    for torrent_item in torrent_items:
+        parse_to_debrid_stream(torrent_item, configb64, config, streams)
 
-    if len(stream_list) == 0:
-        return []
-
-    if config['debrid']:
-        stream_list = sorted(stream_list, key=filter_by_availability)
-        stream_list = sorted(stream_list, key=filter_by_direct_torrnet)
-    return stream_list
+    return rank_streams(streams)